@@ -5,6 +5,9 @@ Tests the wordmake module
 from collections import Counter
 
 import wordmake
+import wordmake_feedback
+import wordmake_store
+import wordmake_sweep
 
 
 def test_guess(guessword, finalword):
@@ -42,8 +45,8 @@ def test_guess(guessword, finalword):
     ['y', 'g', 'y', 'b', 'b']
     """
     if guessword is finalword:
-        return ["g"] * 5
-    outarray = ["b"] * 5
+        return ["g"] * len(guessword)
+    outarray = ["b"] * len(guessword)
     letter_freq = Counter(list(finalword))
     letters_guessed = set(guessword)
     for i in letters_guessed:
@@ -83,7 +86,9 @@ def find_all(string, substring):
         start += 1
 
 
-def test_wordguess(finalword, startingword=None, debug=True, wordlist=None):
+def test_wordguess(
+    finalword, startingword=None, debug=True, wordlist=None, evaluator=None
+):
     """
     Test wordmake's wordguess method
 
@@ -95,6 +100,8 @@ def test_wordguess(finalword, startingword=None, debug=True, wordlist=None):
     :type debug: bool
     :param wordlist: The list of legal words to guess, Ubuntu words if not specified
     :type wordlist: list of strings
+    :param evaluator: The function scoring each guess, test_guess if not specified
+    :type evaluator: function
     :return: The number of guesses it took to guess the final word
     :rtype: int
     """
@@ -105,43 +112,30 @@ def test_wordguess(finalword, startingword=None, debug=True, wordlist=None):
         test_wordler.add_wordlist(filename="/usr/share/dict/words")
     # print(f"{guess_word} was correct! Guessed in {guessCount} guesses")
     return test_wordler.play(
-        startingwords=startingword, evaluator=test_guess, final_word=finalword
+        startingwords=startingword,
+        evaluator=evaluator or test_guess,
+        final_word=finalword,
     )
 
 
-def find_best_starting_word():
+def find_best_starting_word(workers=None):
     """
-    Tries to find the best starting word in the Ubuntu dictionary
+    Tries to find the best starting word in the Ubuntu dictionary. The results
+    are kept in results.jsonl, so an interrupted run resumes where it stopped
+
+    :param workers: The number of worker processes, one per core if not specified
+    :type workers: int
     """
     test_wordler = wordmake.Wordler()
     test_wordler.add_wordlist(filename="/usr/share/dict/words")
     wordlist = test_wordler.get_wordlist()
-    # checklist = wordlist[0:20]
-
-    with open("results.txt", "w", encoding="utf-8") as fileout:
-        bestscore = 6
-        bestword_score = ""
-        bestfail = 500
-        bestword_failure = ""
-
-        for index, word in enumerate(wordlist):
-            outlist = []
-            for i in wordlist:
-                # print(f"Guessing on {i}")
-                outlist.append(test_wordguess(i, word, False, wordlist))
-                # print(f"----------{subindex/len(wordlist):.2%} done----------")
-            # print(f"Average guess score {sum(outlist)/len(outlist)}")
-            avgscore = sum(outlist) / len(outlist)
-            failcount = len([i for i in outlist if i > 6])
-            fileout.write(f"{word},{avgscore},{failcount}\n")
-            if avgscore < bestscore:
-                bestscore = avgscore
-                bestword_score = word
-            # print(f"Fails on {len([i for i in outlist if i>6])} words")
-            if failcount < bestfail:
-                bestfail = failcount
-                bestword_failure = word
-            print(f"***{(index+1)/len(wordlist):.2%} done***")
+
+    with wordmake_sweep.open_store(wordlist) as store:
+        for _ in wordmake_sweep.resume(store, wordlist, workers):
+            print(f"***{len(store)/len(wordlist):.2%} done***")
+    store.export_csv("results.txt", wordlist)
+    bestword_failure, _, bestfail = store.best_by_failures()[0]
+    bestword_score, bestscore, _ = store.best_by_score()[0]
     print(f"Least fails : {bestfail} with {bestword_failure}")
     print(f"Best score: {bestscore} with {bestword_score}")
 
@@ -154,25 +148,15 @@ def check_starting_word(startingword):
     :type startingword: string
     """
     print("Trying " + startingword)
-    with open("/usr/share/dict/words", encoding="utf-8") as dictionary:
-        templist = dictionary.readlines()
-        wordlist = list(
-            dict.fromkeys(
-                [
-                    i.strip().lower()
-                    for i in templist
-                    if len(i.strip()) == 5
-                    and i.strip().isalpha()
-                    and i.isascii()
-                    and i.islower()
-                ]
-            )
-        )
+    wordlist = wordmake_store.load_wordlist("/usr/share/dict/words")
+    feedback = wordmake_feedback.FeedbackMatrix(wordlist)
     outlist = []
     # index = 1
     for i in wordlist:
         # print(f"Guessing on {i}")
-        outlist.append(test_wordguess(i, startingword, False, wordlist))
+        outlist.append(
+            test_wordguess(i, startingword, False, wordlist, feedback.evaluate)
+        )
         # print(f"----------{index*100/len(wordlist)}% done----------")
         # index += 1
 
@@ -3,31 +3,91 @@ Wordmake is a module containing a few methods I use to solve Wordle puzzles.
 It should probably containing a class definition, but it doesn't yet.
 """
 
+import itertools
 from collections import Counter
-from collections import namedtuple
+from collections import OrderedDict
+
+import wordmake_feedback
+import wordmake_index
+import wordmake_instrument
+import wordmake_state
+import wordmake_store
+import wordmake_strategy
 
 
 class NoWordsLeftException(Exception):
     """Exception for when all words have been eliminated (usually by accident)"""
 
 
-class Wordler:
+class GameAttrs(dict):
+    """
+    The game attributes of a Wordler. While a candidate bitset is attached, the
+    "game_list" entry is only built from it when it is actually looked up.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.index = None
+        self.candidates = None
+
+    def __missing__(self, key):
+        if key == "game_list" and self.candidates is not None:
+            game_list = self.index.materialize(self.candidates)
+            super().__setitem__(key, game_list)
+            return game_list
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "game_list":
+            self.candidates = None
+        super().__setitem__(key, value)
+
+    def set_candidates(self, index, candidates):
+        """
+        Replaces the game list with a candidate bitset over the given index
+        """
+        self.pop("game_list", None)
+        self.index = index
+        self.candidates = candidates
+
+    def get_candidates(self, index):
+        """
+        Returns the game list as a bitset over the given index,
+        or None if the game list can't be expressed over it
+        """
+        if self.candidates is not None and self.index is index:
+            return self.candidates
+        return index.bits_for(self["game_list"])
+
+
+class Wordler:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """
     The Wordler class encapsulates the solver half of the Wordlebot code
     """
 
-    def __init__(self, verbosity=1):
+    def __init__(self, verbosity=1, strategy=None):
         self.length = 5
         self.wordlist = []
-        checked_letters = namedtuple("checked_letters", ["greens", "yellows", "blacks"])
-        self.checked_letters = checked_letters({}, {}, {})
+        self.answers = None
+        self.checked_letters = wordmake_state.CheckedLetters({}, {}, {})
         self.counter = Counter([j for i in self.wordlist for j in i])
-        self.game_attrs = {
-            "game_over": False,
-            "game_list": self.wordlist,
-            "guess_count": 0,
-            "final_word": None,
-        }
+        self.game_attrs = GameAttrs(
+            {
+                "game_over": False,
+                "game_list": self.wordlist,
+                "guess_count": 0,
+                "final_word": None,
+            }
+        )
+        self.index = None
+        self.feedback = None
+        self.lexicon = None
+        self.strategy = strategy or wordmake_strategy.FrequencyStrategy()
+        self.policy = None
+        self.policy_node = None
+        self.cache_stats = {}
+        self.instrument = None
+        self.turn_record = None
         self.verbosity = verbosity
         self.guess_word = ""
 
@@ -36,33 +96,143 @@ class Wordler:
         This resets the game, but maintains any wordlists
         """
         if self.wordlist:
-            self.counter = Counter([j for i in self.wordlist for j in i])
-            self.game_attrs["game_list"] = self.wordlist
-        checked_letters = namedtuple("checked_letters", ["greens", "yellows", "blacks"])
-        self.checked_letters = checked_letters({}, {}, {})
+            self.game_attrs["game_list"] = self.get_answers()
+            self.refresh_counter()
+        self.checked_letters = wordmake_state.CheckedLetters({}, {}, {})
         self.game_attrs["game_over"] = False
         self.game_attrs["guess_count"] = 0
+        self.policy_node = 0 if self.policy else None
+
+    def snapshot(self):
+        """
+        Captures the current game as an immutable wordmake_state.GameState.
+        The candidate bitset is shared rather than copied, so this is cheap.
 
-    def add_wordlist(self, filename=None, wordlist=None):
+        :return: The state of the game
+        :rtype: wordmake_state.GameState
         """
-        Adds a word list to the Wordler objects
+        index = self.get_index()
+        candidates = self.game_attrs.get_candidates(index)
+        if candidates is None:
+            raise ValueError("The game list can't be expressed over the wordlist index")
+        return wordmake_state.GameState(
+            index,
+            candidates,
+            wordmake_state.pack_letters(self.checked_letters),
+            self.game_attrs["guess_count"],
+            self.game_attrs["game_over"],
+            self.game_attrs["final_word"],
+            self.guess_word,
+            self.policy_node,
+        )
+
+    def restore(self, state):
         """
+        Returns the game to a state from snapshot or GameState.branch
+
+        :param state: The state to return to
+        :type state: wordmake_state.GameState
+        """
+        if state.word_index is not self.get_index():
+            raise ValueError("The state was taken over a different wordlist")
+        self.game_attrs.set_candidates(state.word_index, state.candidates)
+        self.checked_letters = state.checked_letters()
+        self.game_attrs["guess_count"] = state.guess_count
+        self.game_attrs["game_over"] = state.game_over
+        self.game_attrs["final_word"] = state.final_word
+        self.guess_word = state.guess_word
+        self.policy_node = state.policy_node if self.policy else None
+        self.refresh_counter()
+
+    def load_policy(self, policy):
+        """
+        Plays from a compiled decision tree (see wordmake_policy) instead of
+        computing each guess, for as long as the game stays on the tree
+
+        :param policy: The tree compiled for this wordlist and strategy, or None to
+            stop using one
+        :type policy: wordmake_policy.PolicyTree
+        """
+        if policy is not None and not policy.matches(
+            self.get_answers(), self.strategy, self.wordlist
+        ):
+            raise ValueError("The policy was compiled for a different wordlist or strategy")
+        self.policy = policy
+        self.policy_node = (
+            0 if policy and self.game_attrs["guess_count"] == 0 else None
+        )
+
+    def leave_policy(self):
+        """
+        Switches back to computing guesses, catching the game list and letter
+        counts up with every result so far
+        """
+        self.policy_node = None
+        self.game_attrs["game_list"] = self.get_answers()
+        self.gen_new_list()
+        self.refresh_counter()
+
+    def add_wordlist(self, filename=None, wordlist=None, store=None):
+        """
+        Adds a word list to the Wordler objects. Dictionary files are read through
+        the compiled cache in wordmake_store, so only a changed file is parsed again.
+        With a wordmake_store.WordStore, the wordlist and every game list are views
+        over the store's packed array instead of lists of strings. A wordlist or
+        store sets the word length to the length of its words, and drops any
+        answer list added before
+        """
+        self.lexicon = None
+        self.answers = None
         if filename:
-            with open(filename, encoding="utf-8") as dictionary:
-                self.wordlist = list(
-                    dict.fromkeys(
-                        [
-                            i.strip().lower()
-                            for i in dictionary.readlines()
-                            if len(i.strip()) == self.length
-                            and i.strip().isalpha()
-                            and i.isascii()
-                            and i.islower()
-                        ]
-                    )
-                )
+            self.wordlist = wordmake_store.load_wordlist(filename, self.length)
         if wordlist:
             self.wordlist = wordlist
+            self.length = len(wordlist[0])
+        if store is not None:
+            self.wordlist = store.words
+            self.length = store.packed.shape[1]
+
+    def use_lexicon(self, lexicon, length=None):
+        """
+        Plays with the words of one length from a wordmake_store.Lexicon, sharing
+        its wordlist, index and feedback table with every other Wordler using it
+
+        :param lexicon: The lexicon
+        :type lexicon: wordmake_store.Lexicon
+        :param length: The word length, the current one if not specified
+        :type length: int
+        """
+        if length is not None:
+            self.length = length
+        self.lexicon = lexicon
+        self.wordlist = lexicon.wordlist(self.length)
+        self.answers = None
+
+    def add_answers(self, filename=None, wordlist=None):
+        """
+        Restricts the possible answers to a list of their own, while any word of
+        the wordlist may still be guessed. Candidates are then kept over the answer
+        list, and the partition strategies score every word of the wordlist
+        against only the answers still possible
+
+        :param filename: The file of answers, read through the compiled cache
+        :type filename: string
+        :param wordlist: The list of answers
+        :type wordlist: list of strings
+
+        >>> wordler = Wordler(verbosity=0, strategy=wordmake_strategy.ExpectedSizeStrategy())
+        >>> wordler.add_wordlist(wordlist=["arose", "alamo", "delve", "llama", "cloud", "mound"])
+        >>> wordler.add_answers(wordlist=["alamo", "llama", "mound"])
+        >>> wordler.play_many(["alamo", "llama", "mound"], startingwords="delve")
+        [2, 3, 2]
+        """
+        if filename:
+            wordlist = wordmake_store.load_wordlist(filename, self.length)
+        missing = set(wordlist) - set(self.wordlist)
+        if missing:
+            raise ValueError(f"{min(missing)} is an answer but not in the wordlist")
+        self.answers = wordlist
+        self.game_attrs["game_list"] = wordlist
 
     def get_wordlist(self):
         """
@@ -70,6 +240,13 @@ class Wordler:
         """
         return self.wordlist
 
+    def get_answers(self):
+        """
+        Returns the words that may be the answer, the whole wordlist unless an
+        answer list was added
+        """
+        return self.wordlist if self.answers is None else self.answers
+
     def wordsuggest(self, depth):
         """
         Suggests the word with the greatest letter frequency usage
@@ -84,6 +261,31 @@ class Wordler:
         :return: The best word to guess
         :rtype: string
         """
+        index = self.get_index()
+        candidates = self.game_attrs.get_candidates(index)
+        if candidates is None:
+            return self.wordsuggest_list(depth)
+        bestword, depth = wordmake_index.suggest_word_depth(
+            index, candidates, self.counter, depth, len(self.get_answers()) > 1
+        )
+        if self.turn_record is not None:
+            self.turn_record["depth"] = depth
+        if bestword is None:
+            raise NoWordsLeftException
+        return bestword
+
+    def wordsuggest_list(self, depth):
+        """
+        The recursive form of wordsuggest, used when the game list can't be
+        expressed over the bitset index
+
+        :param depth: The top *depth* most common letters will be considered
+        :type depth: int
+        :return: The best word to guess
+        :rtype: string
+        """
+        if self.turn_record is not None:
+            self.turn_record["depth"] = max(self.turn_record.get("depth", 0), depth)
         letters = self.counter.most_common(depth)
         newlist = [
             j
@@ -102,10 +304,10 @@ class Wordler:
                     bestcount = count
             if (
                 len(set(bestword)) < len(list(bestword))
-                and len(self.wordlist) > 1
+                and len(self.get_answers()) > 1
                 and depth < len(self.counter)
             ):
-                trialword = self.wordsuggest(depth + 1)
+                trialword = self.wordsuggest_list(depth + 1)
                 newcount = sum(
                     self.counter[letter] for letter in dict.fromkeys(trialword)
                 )
@@ -113,7 +315,7 @@ class Wordler:
                     return trialword
                 return bestword
             return bestword
-        return self.wordsuggest(depth + 1)
+        return self.wordsuggest_list(depth + 1)
 
     def guess_eval(self, guess, result):
         """
@@ -122,33 +324,21 @@ class Wordler:
 
         :param guess: The word guessed
         :type guess: string
-        :param result: The result of the guess
-        :type result: string or list of strings
-        :param greens: The previous known letters with verified existence and placement
-        :type greens: dictionary
-        :param yellows: The previous known letters with verified existence but not placement
-        :type yellows: dictionary
-        :param blacks: The previous known letters with verified non-existence
-        :type blacks: dictionary
-        :return: The three input dictionaries with the new information added
-        :rtype: three dictionaries
+        :param result: The result of the guess, as a pattern code or as 'g', 'y' and 'b'
+        :type result: int, string or list of strings
+        :return: The pattern code of the result
+        :rtype: int
         """
-        for index, i in enumerate(guess):
-            if result[index] == "g":
-                if i in self.checked_letters.greens:
-                    self.checked_letters.greens[i][index] = None
+        code = wordmake_feedback.as_pattern(result)
+        positions = wordmake_feedback.pattern_positions(code, len(guess))
+        for group, nums in zip(self.checked_letters, positions):
+            for num in nums:
+                letter = guess[num]
+                if letter in group:
+                    group[letter][num] = None
                 else:
-                    self.checked_letters.greens[i] = dict.fromkeys([index])
-            elif result[index] == "y":
-                if i in self.checked_letters.yellows:
-                    self.checked_letters.yellows[i][index] = None
-                else:
-                    self.checked_letters.yellows[i] = dict.fromkeys([index])
-            elif result[index] == "b":
-                if i in self.checked_letters.blacks:
-                    self.checked_letters.blacks[i][index] = None
-                else:
-                    self.checked_letters.blacks[i] = dict.fromkeys([index])
+                    group[letter] = dict.fromkeys([num])
+        return code
 
     def gen_new_list(self):
         """
@@ -166,9 +356,31 @@ class Wordler:
         :return: The new word list
         :rtype: list of strings
         """
-        self.game_attrs["game_list"] = [
-            i for i in self.game_attrs["game_list"] if self.validate_word(i)
-        ]
+        index = self.get_index()
+        candidates = self.game_attrs.get_candidates(index)
+        if candidates is None:
+            self.game_attrs["game_list"] = [
+                i for i in self.game_attrs["game_list"] if self.validate_word(i)
+            ]
+        else:
+            self.game_attrs.set_candidates(
+                index, index.filter(candidates, self.checked_letters)
+            )
+
+    def get_index(self):
+        """
+        Returns the bitset index of the possible answers, building it on first use
+        """
+        answers = self.get_answers()
+        if self.index is None or self.index.source is not answers:
+            if (
+                self.lexicon is not None
+                and self.lexicon.wordlist(self.length) is answers
+            ):
+                self.index = self.lexicon.index(self.length)
+            if self.index is None or self.index.source is not answers:
+                self.index = wordmake_index.shared_index(answers)
+        return self.index
 
     def validate_word(self, word):
         """
@@ -216,6 +428,16 @@ class Wordler:
         """
         Makes another guess
         """
+        if self.policy_node is not None:
+            if self.policy_node >= 0 and self.policy.startingwords == (
+                normalize_startingwords(startingwords)
+            ):
+                self.guess_word = self.policy.guess(self.policy_node)
+                if self.verbosity:
+                    print(self.guess_word)
+                self.game_attrs["guess_count"] += 1
+                return self.guess_word
+            self.leave_policy()
         if isinstance(startingwords, list) and self.game_attrs["guess_count"] < len(
             startingwords
         ):
@@ -224,9 +446,12 @@ class Wordler:
             self.guess_word = startingwords
         else:
             try:
-                self.guess_word = self.wordsuggest(5)
+                self.guess_word = wordmake_instrument.timed(
+                    self.turn_record, "wordsuggest", self.strategy.suggest, self
+                )
             except NoWordsLeftException as no_words_left:
-                print("There are no words left!")
+                if self.verbosity:
+                    print("There are no words left!")
                 raise NoWordsLeftException from no_words_left
         if self.verbosity:
             print(self.guess_word)
@@ -240,9 +465,22 @@ class Wordler:
         if evaluator is None:
             result = collect_input(self.guess_word)
         else:
-            result = evaluator(self.guess_word, self.game_attrs["final_word"])
-        self.guess_eval(self.guess_word, result)
-        self.gen_new_list()
+            result = wordmake_instrument.timed(
+                self.turn_record,
+                "evaluator",
+                evaluator,
+                self.guess_word,
+                self.game_attrs["final_word"],
+            )
+        code = self.guess_eval(self.guess_word, result)
+        if self.policy_node is not None:
+            child = self.policy.child(self.policy_node, code)
+            if child is not None:
+                self.policy_node = child
+                return
+            self.policy_node = None
+            self.game_attrs["game_list"] = self.get_answers()
+        wordmake_instrument.timed(self.turn_record, "gen_new_list", self.gen_new_list)
 
     def update_gamestate(self):
         """
@@ -250,46 +488,342 @@ class Wordler:
         """
         if sum(len(i) for i in self.checked_letters.greens.values()) == self.length:
             self.game_attrs["game_over"] = True
-        else:
+        elif self.policy_node is None:
+            wordmake_instrument.timed(
+                self.turn_record, "refresh_counter", self.refresh_counter
+            )
+
+    def get_feedback(self):
+        """
+        Returns the feedback table of the wordlist against the possible answers,
+        loading or building it on first use
+        """
+        if (
+            self.feedback is None
+            or self.feedback[0] is not self.wordlist
+            or self.feedback[1] is not self.answers
+        ):
+            if (
+                self.lexicon is not None
+                and self.answers is None
+                and self.lexicon.wordlist(self.length) is self.wordlist
+            ):
+                feedback = self.lexicon.feedback(self.length)
+            else:
+                feedback = wordmake_feedback.FeedbackMatrix(self.wordlist, self.answers)
+            self.feedback = (self.wordlist, self.answers, feedback)
+        return self.feedback[2]
+
+    def refresh_counter(self):
+        """
+        Brings the letter counts up to date with the game list. When the counts
+        already track a candidate set, only the words that left or joined it are touched
+        """
+        index = self.get_index()
+        candidates = self.game_attrs.get_candidates(index)
+        if candidates is None:
             self.counter = Counter([j for i in self.game_attrs["game_list"] for j in i])
+        elif (
+            isinstance(self.counter, wordmake_index.LetterCounts)
+            and self.counter.index is index
+        ):
+            self.counter.update(candidates)
+        else:
+            self.counter = wordmake_index.LetterCounts(index, candidates)
 
     def play(self, startingwords=None, evaluator=None, final_word=None):
         """
         The play function plays the game of Wordle against the human
         """
         self.game_attrs["game_over"] = False
-        self.game_attrs["game_list"] = self.wordlist
-        self.counter = Counter([j for i in self.game_attrs["game_list"] for j in i])
+        self.game_attrs["game_list"] = self.get_answers()
+        self.refresh_counter()
         if final_word:
             self.game_attrs["final_word"] = final_word
 
         while not self.game_attrs["game_over"]:
-            self.make_guess(startingwords)
-            self.eval_word(evaluator)
-            self.update_gamestate()
-
+            if self.instrument is None:
+                self.make_guess(startingwords)
+                self.eval_word(evaluator)
+                self.update_gamestate()
+            else:
+                self.instrumented_turn(startingwords, evaluator)
+
+        if self.instrument is not None:
+            self.instrument.record(
+                {
+                    "event": "game",
+                    "final_word": self.game_attrs["final_word"],
+                    "guess_count": self.game_attrs["guess_count"],
+                }
+            )
         return self.game_attrs["guess_count"]
 
+    def instrumented_turn(self, startingwords, evaluator):
+        """
+        Plays one turn, timing each phase, and hands the turn record to the
+        instrument sink (see wordmake_instrument)
+        """
+        record = {
+            "event": "turn",
+            "turn": self.game_attrs["guess_count"] + 1,
+            "phases": {},
+            "candidates_before": self.candidate_count(),
+        }
+        self.turn_record = record
+        try:
+            wordmake_instrument.timed(
+                record, "make_guess", self.make_guess, startingwords
+            )
+            wordmake_instrument.timed(record, "eval_word", self.eval_word, evaluator)
+            record["candidates_after"] = self.candidate_count()
+            wordmake_instrument.timed(record, "update_gamestate", self.update_gamestate)
+        finally:
+            self.turn_record = None
+        record["guess"] = self.guess_word
+        record["suggest_depth"] = record.pop("depth", None)
+        self.instrument.record(record)
+
+    def candidate_count(self):
+        """
+        Returns the number of candidates left, or None while playing from a policy
+        """
+        if self.policy_node is not None:
+            return None
+        if self.game_attrs.candidates is not None:
+            return bin(self.game_attrs.candidates).count("1")
+        return len(self.game_attrs["game_list"])
 
-def word_make(char_list, length):
+    def play_many(self, answers, startingwords=None, evaluator=None, cache_size=4096):
+        """
+        Plays one game per answer, sharing work between games that reach the same
+        state. The solver is deterministic, so games with the same guess and feedback
+        history have the same candidates and the same next guess, and those are
+        kept in an LRU cache keyed by the history. The cache statistics end up in
+        cache_stats, along with those of the strategy's own table under "strategy"
+        if it keeps one. With an instrument sink attached every game goes through play,
+        so each turn is measured.
+
+        :param answers: The final words to play against
+        :type answers: list of strings
+        :param startingwords: The starting word or words
+        :type startingwords: string, list of strings or None
+        :param evaluator: The function scoring each guess, the feedback table if not given
+        :type evaluator: function
+        :param cache_size: The most states to keep
+        :type cache_size: int
+        :return: The number of guesses each game took, in the order of *answers*
+        :rtype: list of ints
+        """
+        if evaluator is None:
+            evaluator = self.get_feedback().evaluate
+        index = self.get_index()
+        cache = StateCache(cache_size)
+        outlist = []
+        for answer in answers:
+            self.reset()
+            if (
+                self.policy is not None
+                or self.instrument is not None
+                or index.bits_for(self.get_answers()) is None
+            ):
+                outlist.append(self.play(startingwords, evaluator, answer))
+                continue
+            self.game_attrs["final_word"] = answer
+            history = ()
+            while not self.game_attrs["game_over"]:
+                self.guess_word = cache.get_guess(history)
+                if self.guess_word is None:
+                    self.refresh_counter()
+                    self.make_guess(startingwords)
+                    cache.put(history, self.game_attrs.candidates, self.guess_word)
+                else:
+                    self.game_attrs["guess_count"] += 1
+                code = self.guess_eval(self.guess_word, evaluator(self.guess_word, answer))
+                history += ((self.guess_word, code),)
+                candidates = cache.get_candidates(history)
+                if candidates is None:
+                    self.gen_new_list()
+                    cache.put(history, self.game_attrs.candidates)
+                else:
+                    self.game_attrs.set_candidates(index, candidates)
+                if (
+                    sum(len(i) for i in self.checked_letters.greens.values())
+                    == self.length
+                ):
+                    self.game_attrs["game_over"] = True
+            outlist.append(self.game_attrs["guess_count"])
+        self.cache_stats = cache.stats()
+        if hasattr(self.strategy, "stats"):
+            self.cache_stats["strategy"] = self.strategy.stats()
+        return outlist
+
+
+class StateCache:
+    """
+    An LRU cache of solver states for Wordler.play_many, keyed by the
+    (guess, pattern) history of a game. Each state holds the candidate bitset
+    after that history, or None if only the guess is kept, and, once known, the
+    guess made from it.
     """
-    Takes a list of characters and an integer length and generates all
-    combinations of the characters at that length.
+
+    def __init__(self, size):
+        self.size = size
+        self.states = OrderedDict()
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _get(self, history, field):
+        state = self.states.get(history)
+        if state is None or state[field] is None:
+            self.counts["misses"] += 1
+            return None
+        self.counts["hits"] += 1
+        self.states.move_to_end(history)
+        return state[field]
+
+    def get_candidates(self, history):
+        """
+        Returns the candidate bitset after a history, or None if it isn't cached
+        """
+        return self._get(history, 0)
+
+    def get_guess(self, history):
+        """
+        Returns the guess made after a history, or None if it isn't cached
+        """
+        return self._get(history, 1)
+
+    def put(self, history, candidates, guess=None):
+        """
+        Stores the state after a history, evicting the least recently used state
+        """
+        self.states[history] = [candidates, guess]
+        self.states.move_to_end(history)
+        if len(self.states) > self.size:
+            self.states.popitem(last=False)
+            self.counts["evictions"] += 1
+
+    def stats(self):
+        """
+        Returns the hit, miss and eviction counts, the hit rate and the size
+        """
+        lookups = self.counts["hits"] + self.counts["misses"]
+        return dict(
+            self.counts,
+            hit_rate=self.counts["hits"] / lookups if lookups else 0.0,
+            size=len(self.states),
+        )
+
+
+def normalize_startingwords(startingwords):
+    """
+    Converts the startingwords argument of Wordler.play into a tuple
+
+    :param startingwords: The starting word or words
+    :type startingwords: string, list of strings or None
+    :return: The starting words
+    :rtype: tuple of strings
+
+    >>> normalize_startingwords("clamp")
+    ('clamp',)
+    >>> normalize_startingwords(None)
+    ()
+    """
+    if isinstance(startingwords, str):
+        return (startingwords,)
+    if isinstance(startingwords, list):
+        return tuple(startingwords)
+    return ()
+
+
+def word_make(char_list, length, trie=None, checked_letters=None):
+    """
+    Takes a list of characters and an integer length and lazily generates all
+    combinations of the characters at that length. Given the prefix trie of a
+    wordlist (see wordmake_index.WordIndex.trie), only prefixes that can still
+    become a word are followed, so only the wordlist's words are generated.
+    Given the checked letters of a game, only words that satisfy them are
+    generated, and letters are ruled out position by position as they are
+    chosen. Either way the work done is proportional to what is generated.
 
     :param char_list: The list of characters to use
     :type char_list: list of strings
     :param length: Length of strings to generate
     :type length: int
-    :return: The list of strings generated
-    :rtype: list of strings
+    :param trie: The prefix trie of the words to allow
+    :type trie: dictionary
+    :param checked_letters: The greens, yellows and blacks dictionaries
+    :type checked_letters: namedtuple
+    :return: The strings generated, in the order of *char_list*
+    :rtype: generator of strings
+
+    >>> list(word_make(["a", "b"], 2))
+    ['aa', 'ab', 'ba', 'bb']
+    >>> index = wordmake_index.WordIndex(["arose", "alamo", "delve", "llama"])
+    >>> list(word_make(list("abcdelmorsv"), 5, trie=index.trie()))
+    ['alamo', 'arose', 'delve', 'llama']
+    >>> checked = wordmake_state.CheckedLetters({"a": {4: None}}, {}, {"r": {1: None}})
+    >>> list(word_make(list("alm"), 5, trie=index.trie(), checked_letters=checked))
+    ['llama']
     """
-    outlist = []
-    if length == 1:
-        return char_list
-    for i in char_list:
-        subwords = word_make(char_list, length - 1)
-        outlist.extend([i + j for j in subwords])
-    return outlist
+    allowed, required = allowed_letters(char_list, length, checked_letters)
+    if trie is None and not required:
+        return ("".join(i) for i in itertools.product(*allowed))
+    return _walk_trie(trie, allowed, required, "")
+
+
+def allowed_letters(char_list, length, checked_letters=None):
+    """
+    Turns the checked letters of a game into the letters allowed at each
+    position, following the same rules as Wordler.validate_word
+
+    :param char_list: The list of characters to use
+    :type char_list: list of strings
+    :param length: The word length
+    :type length: int
+    :param checked_letters: The greens, yellows and blacks dictionaries
+    :type checked_letters: namedtuple
+    :return: The letters allowed at each position, and the letters every word must contain
+    :rtype: tuple
+
+    >>> checked = wordmake_state.CheckedLetters({"a": {4: None}}, {"l": {0: None}}, {})
+    >>> allowed_letters(["a", "l"], 5, checked)
+    ([['a'], ['a', 'l'], ['a', 'l'], ['a', 'l'], ['a']], frozenset({'l'}))
+    """
+    allowed = [list(char_list) for _ in range(length)]
+    if checked_letters is None:
+        return allowed, frozenset()
+    greens, yellows, blacks = checked_letters
+    for letter in blacks:
+        if letter not in yellows and letter not in greens:
+            allowed = [[i for i in column if i != letter] for column in allowed]
+    for group in (blacks, yellows):
+        for letter, pos in group.items():
+            for num in pos:
+                allowed[num] = [i for i in allowed[num] if i != letter]
+    for letter, pos in greens.items():
+        for num in pos:
+            allowed[num] = [i for i in allowed[num] if i == letter]
+    return allowed, frozenset(yellows)
+
+
+def _walk_trie(node, allowed, required, prefix):
+    """
+    Generates the completions of a prefix, depth first. A node of None means
+    there is no trie, and any letter may follow.
+    """
+    depth = len(prefix)
+    # The letters still required must fit in the positions left.
+    if len(required) > len(allowed) - depth:
+        return
+    if depth == len(allowed):
+        if node is None or "" in node:
+            yield prefix
+        return
+    for letter in allowed[depth]:
+        child = None if node is None else node.get(letter)
+        if node is None or child is not None:
+            yield from _walk_trie(child, allowed, required - {letter}, prefix + letter)
 
 
 def collect_input(guess):
@@ -298,8 +832,8 @@ def collect_input(guess):
 
     :param guess: The guess to be evaluated
     :type guess: string
-    :return: The user input as a list
-    :rtype: list of strings
+    :return: The pattern code of the user input
+    :rtype: int
     """
     outlist = []
     for i in guess:
@@ -311,7 +845,7 @@ def collect_input(guess):
                 status = ""
             else:
                 outlist.append(status)
-    return outlist
+    return wordmake_feedback.encode_pattern(outlist)
 
 
 def main():
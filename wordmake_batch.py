@@ -0,0 +1,315 @@
+"""
+Wordmake_batch suggests the next guess for many games at once.
+
+Each input line is one game as JSON, with the guesses made so far and the
+feedback for each, as strings of 'g', 'y' and 'b' or as pattern codes::
+
+    {"id": 7, "guesses": ["arose", "unlit"], "feedback": ["bybbb", "bbgyb"]}
+
+and each output line, in the same order, holds the next guess, whether the game
+is over, or why the line couldn't be answered, with the input's id if it has one.
+
+The dictionary is loaded once per process, into one Wordler that every game is
+replayed into. Lines are read and answered a chunk at a time, so the input is
+never held in memory as a whole. Games with the same history get the same
+guess, so each distinct history in a chunk is solved once, and the guesses are
+kept in an LRU cache across chunks. With several workers, chunks are handed to
+a pool of processes, with only a few chunks in flight at once.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import sys
+from collections import deque
+
+import wordmake
+import wordmake_feedback
+import wordmake_store
+import wordmake_strategy
+import wordmake_sweep
+
+DICTIONARY = "/usr/share/dict/words"
+
+_worker_state = {}
+
+
+class BatchSolver:
+    """
+    The BatchSolver answers game histories with one Wordler, loaded once
+
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param startingwords: The starting word or words
+    :type startingwords: string, list of strings or None
+    :param answers: The possible answers, the whole wordlist if not given
+    :type answers: list of strings
+    :param strategy: The name of the strategy in wordmake_strategy.STRATEGIES
+    :type strategy: string
+    :param cache_size: The most histories to keep guesses for
+    :type cache_size: int
+
+    >>> solver = BatchSolver(["arose", "alamo", "delve", "llama"], "arose")
+    >>> for line in solver.solve_lines([
+    ...     '{"id": 1}',
+    ...     '{"id": 2, "guesses": ["arose"], "feedback": ["ybbbb"]}',
+    ...     '{"guesses": ["arose"], "feedback": [1]}',
+    ...     '{"guesses": ["arose"], "feedback": ["ggggg"]}',
+    ...     '{"guesses": ["arose"], "feedback": ["bbb"]}',
+    ...     '{"guesses": ["PLANT"], "feedback": ["bybbb"]}',
+    ...     '{"guesses": ["12345"], "feedback": ["bbbbb"]}',
+    ...     '{"guesses": ["ÀROSE"], "feedback": ["bbbbb"]}',
+    ... ]):
+    ...     print(line)
+    {"id": 1, "guess": "arose"}
+    {"id": 2, "guess": "llama"}
+    {"guess": "llama"}
+    {"game_over": true}
+    {"error": "The feedback must be 5 of 'g', 'y' and 'b' or a pattern code"}
+    {"guess": "delve"}
+    {"error": "The guesses must be words of length 5"}
+    {"error": "The guesses must be words of length 5"}
+    >>> solver.cache.stats()["size"]
+    3
+    """
+
+    def __init__(
+        self,
+        wordlist,
+        startingwords=None,
+        *,
+        answers=None,
+        strategy="frequency",
+        cache_size=65536,
+    ):
+        self.wordler = wordmake.Wordler(
+            verbosity=0, strategy=wordmake_strategy.STRATEGIES[strategy]()
+        )
+        self.wordler.add_wordlist(wordlist=wordlist)
+        if answers:
+            self.wordler.add_answers(wordlist=answers)
+        self.startingwords = startingwords
+        self.length = self.wordler.length
+        self.cache = wordmake.StateCache(cache_size)
+
+    def parse(self, record):
+        """
+        Reads the history of one game
+
+        :param record: The decoded input line
+        :type record: dict
+        :return: The (guess, pattern) history
+        :rtype: tuple
+        """
+        guesses = record.get("guesses", [])
+        results = record.get("feedback", [])
+        if not isinstance(guesses, list) or not isinstance(results, list):
+            raise ValueError("The guesses and the feedback must be lists")
+        if len(guesses) != len(results):
+            raise ValueError("There must be one feedback for each guess")
+        history = ()
+        for guess, result in zip(guesses, results):
+            if not isinstance(guess, str):
+                raise ValueError(f"The guesses must be words of length {self.length}")
+            guess = guess.lower()
+            if len(guess) != self.length or not (guess.isascii() and guess.isalpha()):
+                raise ValueError(f"The guesses must be words of length {self.length}")
+            if history and history[-1][1] == 3**self.length - 1:
+                raise ValueError("The game was over before the last guess")
+            history += ((guess, self.pattern(result)),)
+        return history
+
+    def pattern(self, result):
+        """
+        Checks one feedback and returns its pattern code
+        """
+        if isinstance(result, list):
+            result = "".join(str(i) for i in result)
+        if isinstance(result, int) and not isinstance(result, bool):
+            valid = 0 <= result < 3**self.length
+        else:
+            valid = (
+                isinstance(result, str)
+                and len(result) == self.length
+                and not set(result) - set("gyb")
+            )
+        if not valid:
+            raise ValueError(
+                f"The feedback must be {self.length} of 'g', 'y' and 'b' or a pattern code"
+            )
+        return wordmake_feedback.as_pattern(result)
+
+    def solve(self, history):
+        """
+        Makes the next guess after a history, replaying it into the Wordler
+        unless the guess is cached
+
+        :param history: The (guess, pattern) history
+        :type history: tuple
+        :return: The next guess, or None if the game is over
+        :rtype: string or None
+        """
+        if history and history[-1][1] == 3**self.length - 1:
+            return None
+        guess = self.cache.get_guess(history)
+        if guess is None:
+            wordler = self.wordler
+            wordler.reset()
+            for word, pattern in history:
+                wordler.guess_eval(word, pattern)
+            wordler.gen_new_list()
+            wordler.game_attrs["guess_count"] = len(history)
+            wordler.refresh_counter()
+            guess = wordler.make_guess(self.startingwords)
+            self.cache.put(history, None, guess)
+        return guess
+
+    def solve_lines(self, lines):
+        """
+        Answers a chunk of input lines, solving each distinct history once.
+        Blank lines are skipped.
+
+        :param lines: The input lines
+        :type lines: list of strings
+        :return: The output lines, without line ends
+        :rtype: list of strings
+        """
+        records = []
+        guesses = {}
+        for line in lines:
+            if not line.strip():
+                continue
+            response = {}
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Each line must be a JSON object")
+                if "id" in record:
+                    response["id"] = record["id"]
+                history = self.parse(record)
+            except ValueError as error:
+                response["error"] = str(error)
+                history = None
+            records.append((response, history))
+            if history is not None and history not in guesses:
+                try:
+                    guesses[history] = self.solve(history)
+                except wordmake.NoWordsLeftException:
+                    guesses[history] = wordmake.NoWordsLeftException
+        outlist = []
+        for response, history in records:
+            if history is not None:
+                guess = guesses[history]
+                if guess is wordmake.NoWordsLeftException:
+                    response["error"] = "There are no words left"
+                elif guess is None:
+                    response["game_over"] = True
+                else:
+                    response["guess"] = guess
+            outlist.append(json.dumps(response))
+        return outlist
+
+
+def _init_worker(wordlist, options):
+    """
+    Loads the solver into a worker process
+    """
+    _worker_state["solver"] = BatchSolver(wordlist, **options)
+
+
+def _solve_chunk(lines):
+    """
+    Answers one chunk of input lines in a worker process
+    """
+    return _worker_state["solver"].solve_lines(lines)
+
+
+def run_batch(  # pylint: disable=too-many-arguments
+    infile, outfile, wordlist, *, chunk_size=1000, workers=1, **options
+):
+    """
+    Answers every line of an input stream, writing the answers in input order
+
+    :param infile: The input, one game per line
+    :type infile: file
+    :param outfile: The output, one answer per line
+    :type outfile: file
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param chunk_size: How many lines to read and answer at once
+    :type chunk_size: int
+    :param workers: The number of worker processes, or 1 to answer in this process
+    :type workers: int
+    :param options: The options of BatchSolver
+    :type options: dict
+    :return: The number of lines written
+    :rtype: int
+    """
+    lines = iter(infile)
+    chunks = iter(lambda: list(itertools.islice(lines, chunk_size)), [])
+    written = 0
+
+    def write(outlist):
+        nonlocal written
+        if outlist:
+            outfile.write("\n".join(outlist) + "\n")
+            written += len(outlist)
+
+    if workers == 1:
+        _init_worker(wordlist, options)
+        for chunk in chunks:
+            write(_solve_chunk(chunk))
+        return written
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(wordlist, options)
+    ) as pool:
+        # Pool.imap would read the whole input ahead, so chunks are handed out
+        # by hand, a few per worker at a time.
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_solve_chunk, (chunk,)))
+            if len(pending) >= 2 * workers:
+                write(pending.popleft().get())
+        while pending:
+            write(pending.popleft().get())
+    return written
+
+
+def main():
+    """
+    Answers the games read from a file or stdin on the system dictionary
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", nargs="?", type=argparse.FileType("r"), default=sys.stdin)
+    parser.add_argument("--output", type=argparse.FileType("w"), default=sys.stdout)
+    parser.add_argument("--dictionary", default=DICTIONARY)
+    parser.add_argument("--answers", default=None)
+    parser.add_argument("--startingwords", nargs="*", default=None)
+    parser.add_argument(
+        "--strategy", choices=sorted(wordmake_strategy.STRATEGIES), default="frequency"
+    )
+    parser.add_argument("--chunk-size", type=wordmake_sweep.positive_int, default=1000)
+    parser.add_argument("--cache-size", type=int, default=65536)
+    parser.add_argument("--workers", type=wordmake_sweep.positive_int, default=1)
+    args = parser.parse_args()
+    wordlist = wordmake_store.load_wordlist(args.dictionary)
+    answers = None
+    if args.answers:
+        answers = wordmake_store.load_wordlist(args.answers, len(wordlist[0]))
+    with args.input, args.output:
+        run_batch(
+            args.input,
+            args.output,
+            wordlist,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            startingwords=args.startingwords or None,
+            answers=answers,
+            strategy=args.strategy,
+            cache_size=args.cache_size,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Wordmake_bench times the solver's hot paths and checks them against a baseline.
+
+Each phase (validate_word, gen_new_list, wordsuggest, update_gamestate, a whole
+play and a small sampled opener sweep) is timed on the system dictionary and on
+synthetic wordlists of growing size, so the results show how each phase scales.
+Fast phases are called until enough time has been measured to average out the
+timer, and each phase's time is the median over several rounds. A fixed
+calibration loop is timed alongside them, so the comparison with the committed
+bench_baseline.json is in units of that loop rather than in seconds and holds
+across machines. Any phase slower than the baseline by more than the threshold
+fails the run, except phases too fast to time reliably.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import wordmake
+
+DICTIONARY = "/usr/share/dict/words"
+BASELINE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json"
+)
+LETTERS = "eaorltisncuydhpmgbfkwvzxqj"
+# Phases faster than this in the baseline are reported but never fail the run.
+MIN_CHECKED = 10e-6
+
+
+def synthetic_wordlist(size, length=5, seed=0):
+    """
+    Makes a reproducible list of distinct random words, common letters first
+
+    :param size: How many words to make
+    :type size: int
+    :param length: The word length
+    :type length: int
+    :param seed: The random seed
+    :type seed: int
+    :return: The words
+    :rtype: list of strings
+
+    >>> synthetic_wordlist(3, seed=1) == synthetic_wordlist(3, seed=1)
+    True
+    >>> len(set(synthetic_wordlist(500)))
+    500
+    """
+    rng = random.Random(seed)
+    letters = list(LETTERS)
+    weights = range(len(LETTERS), 0, -1)
+    words = {}
+    while len(words) < size:
+        words["".join(rng.choices(letters, weights, k=length))] = None
+    return list(words)
+
+
+def time_call(func, setup=None, repeat=7, min_time=0.05):
+    """
+    Returns the median of the mean time of a call over several rounds, leaving the setup
+    out of the timing. Each round makes calls until at least min_time has been
+    timed, so calls of a few microseconds are averaged over many runs.
+
+    :param func: The function to time
+    :type func: function
+    :param setup: A function run before each call, untimed
+    :type setup: function
+    :param repeat: How many rounds to time
+    :type repeat: int
+    :param min_time: The least time to measure in each round, in seconds
+    :type min_time: float
+    :return: The median over the rounds of the mean time of a call, in seconds
+    :rtype: float
+
+    >>> time_call(lambda: None, repeat=1, min_time=0.001) < 0.001
+    True
+    """
+    rounds = []
+    for _ in range(repeat):
+        calls = 0
+        total = 0.0
+        while total < min_time or not calls:
+            if setup:
+                setup()
+            start = time.perf_counter()
+            func()
+            total += time.perf_counter() - start
+            calls += 1
+        rounds.append(total / calls)
+    return statistics.median(rounds)
+
+
+def calibrate():
+    """
+    Times a fixed loop of string and dict work, like the solver's own Python,
+    to measure how fast this machine is
+
+    :return: The time of the loop, in seconds
+    :rtype: float
+    """
+
+    def loop():
+        counts = {}
+        for i in range(10000):
+            word = LETTERS[i % 26 :] + LETTERS[: i % 26]
+            counts[word[:5]] = counts.get(word[:5], 0) + len(set(word))
+
+    return time_call(loop)
+
+
+def bench_wordlist(wordlist, games=20, openers=2):
+    """
+    Times every phase of the solver on one wordlist
+
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param games: How many answers the play and sweep benchmarks use
+    :type games: int
+    :param openers: How many starting words the sweep benchmark tries
+    :type openers: int
+    :return: The time of each phase, in seconds
+    :rtype: dict
+    """
+    rng = random.Random(0)
+    answers = rng.sample(wordlist, min(games, len(wordlist)))
+    wordler = wordmake.Wordler(verbosity=0)
+    wordler.add_wordlist(wordlist=wordlist)
+    evaluator = wordler.get_feedback().evaluate
+
+    def first_guess():
+        wordler.reset()
+        wordler.guess_word = wordlist[0]
+        wordler.guess_eval(
+            wordler.guess_word, evaluator(wordler.guess_word, answers[0])
+        )
+
+    def filtered():
+        first_guess()
+        wordler.gen_new_list()
+
+    first_guess()
+    results = {
+        "validate_word": time_call(
+            lambda: [wordler.validate_word(i) for i in wordlist]
+        ),
+        "gen_new_list": time_call(wordler.gen_new_list, first_guess),
+        "update_gamestate": time_call(wordler.update_gamestate, filtered),
+    }
+    wordler.reset()
+    results["wordsuggest"] = time_call(lambda: wordler.wordsuggest(5))
+
+    def play_all():
+        for answer in answers:
+            wordler.reset()
+            wordler.play(evaluator=evaluator, final_word=answer)
+
+    results["play"] = time_call(play_all) / len(answers)
+    results["sweep"] = time_call(
+        lambda: [wordler.play_many(answers, i, evaluator) for i in answers[:openers]]
+    )
+    return results
+
+
+def run(sizes=(500, 1000, 2000, 4000), dictionary=DICTIONARY):
+    """
+    Runs the benchmarks on the dictionary, if it exists, and on synthetic wordlists
+
+    :param sizes: The sizes of the synthetic wordlists
+    :type sizes: tuple of ints
+    :param dictionary: The dictionary file
+    :type dictionary: string
+    :return: The calibration time, and the phase timings of each wordlist
+    :rtype: dict
+    """
+    phases = {}
+    if dictionary and os.path.exists(dictionary):
+        wordler = wordmake.Wordler(verbosity=0)
+        wordler.add_wordlist(filename=dictionary)
+        phases["dictionary"] = bench_wordlist(wordler.get_wordlist())
+    for size in sizes:
+        phases[f"synthetic-{size}"] = bench_wordlist(synthetic_wordlist(size))
+    return {"calibration": calibrate(), "phases": phases}
+
+
+def compare(results, baseline, threshold=1.0):
+    """
+    Lists the phases that got slower than the baseline by more than the threshold,
+    measuring both in units of their own calibration loop. Phases that took less
+    than MIN_CHECKED in the baseline are left out, as their timing is mostly noise
+
+    :param results: The new timings
+    :type results: dict
+    :param baseline: The baseline timings
+    :type baseline: dict
+    :param threshold: The allowed slowdown, as a fraction of the baseline
+    :type threshold: float
+    :return: (wordlist, phase, slowdown) for each regression
+    :rtype: list of tuples
+
+    >>> compare(
+    ...     {"calibration": 2.0, "phases": {"a": {"play": 8.0, "sweep": 2.0, "gen": 1e-4}}},
+    ...     {"calibration": 1.0, "phases": {"a": {"play": 1.0, "sweep": 1.0, "gen": 1e-6}}},
+    ... )
+    [('a', 'play', 4.0)]
+    """
+    regressions = []
+    scale = baseline["calibration"] / results["calibration"]
+    for name, phases in results["phases"].items():
+        for phase, seconds in phases.items():
+            before = baseline["phases"].get(name, {}).get(phase)
+            if before is None or before < MIN_CHECKED:
+                continue
+            if seconds * scale > before * (1 + threshold):
+                regressions.append((name, phase, seconds * scale / before))
+    return regressions
+
+
+def main():
+    """
+    Runs the benchmarks, writes the results and fails on regressions
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=1.0)
+    parser.add_argument(
+        "--sizes", type=int, nargs="*", default=[500, 1000, 2000, 4000]
+    )
+    parser.add_argument("--dictionary", default=DICTIONARY)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.dictionary)
+    with open(args.output, "w", encoding="utf-8") as fileout:
+        json.dump(results, fileout, indent=2)
+    print(f"calibration {results['calibration'] * 1000:>20.3f} ms")
+    for name, phases in results["phases"].items():
+        print(name)
+        for phase, seconds in phases.items():
+            print(f"    {phase:<18}{seconds * 1000:>12.3f} ms")
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fileout:
+            json.dump(results, fileout, indent=2)
+        return
+    if not os.path.exists(args.baseline):
+        return
+    with open(args.baseline, encoding="utf-8") as filein:
+        regressions = compare(results, json.load(filein), args.threshold)
+    for name, phase, slowdown in regressions:
+        print(f"Regression in {name} {phase}: {slowdown:.2f} times the baseline")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
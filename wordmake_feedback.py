@@ -0,0 +1,530 @@
+"""
+Wordmake_feedback precomputes the feedback of every guess against every answer.
+
+Each feedback pattern is packed into one small integer (a base 3 number with one
+digit per letter), so the whole guess by answer table fits in a compact array.
+The table is saved to disk the first time a wordlist is seen and memory-mapped
+on every later run, so warm starts do no recomputation at all.
+"""
+
+import hashlib
+import os
+from collections.abc import Mapping
+from functools import lru_cache
+
+import numpy as np
+
+BLACK = 0
+YELLOW = 1
+GREEN = 2
+
+STATUS_CODES = {"b": BLACK, "y": YELLOW, "g": GREEN}
+STATUS_LETTERS = "byg"
+# Up to this length pattern_positions reads every code's positions from one
+# precomputed table; the table has 3**length entries, so longer words are decoded.
+POSITION_TABLE_LENGTH = 7
+
+
+def encode_pattern(result):
+    """
+    Packs a feedback result into its integer pattern code
+
+    :param result: The status of each letter, as 'g', 'y' or 'b'
+    :type result: string or list of strings
+    :return: The pattern code, with the first letter as the lowest base 3 digit
+    :rtype: int
+
+    >>> encode_pattern("bbbbb")
+    0
+    >>> encode_pattern(["y", "b", "b", "b", "b"])
+    1
+    >>> encode_pattern("ggggg")
+    242
+    """
+    code = 0
+    for status in reversed(result):
+        code = code * 3 + STATUS_CODES[status]
+    return code
+
+
+def as_pattern(result):
+    """
+    Converts a feedback result in any accepted form into its pattern code
+
+    :param result: The pattern code, or the status of each letter as 'g', 'y' or 'b'
+    :type result: int, string or list of strings
+    :return: The pattern code
+    :rtype: int
+
+    >>> as_pattern("ybbbb"), as_pattern(["y", "b", "b", "b", "b"]), as_pattern(1)
+    (1, 1, 1)
+    """
+    if isinstance(result, (str, list, tuple)):
+        return encode_pattern(result)
+    return int(result)
+
+
+def decode_pattern(code, length=5):
+    """
+    Unpacks an integer pattern code into a feedback result
+
+    :param code: The pattern code
+    :type code: int
+    :param length: The number of letters in the word
+    :type length: int
+    :return: The status of each letter, as 'g', 'y' or 'b'
+    :rtype: list of strings
+
+    >>> decode_pattern(1)
+    ['y', 'b', 'b', 'b', 'b']
+    >>> decode_pattern(encode_pattern("bgyyb"))
+    ['b', 'g', 'y', 'y', 'b']
+    """
+    code = int(code)
+    outlist = []
+    for _ in range(length):
+        code, digit = divmod(code, 3)
+        outlist.append(STATUS_LETTERS[digit])
+    return outlist
+
+
+def pattern_dtype(length):
+    """
+    Returns the smallest unsigned integer type that can hold every pattern code
+
+    :param length: The number of letters in the word
+    :type length: int
+    :return: The numpy integer type
+    :rtype: numpy.dtype
+
+    >>> pattern_dtype(5)
+    dtype('uint8')
+    >>> pattern_dtype(7)
+    dtype('uint16')
+    >>> pattern_dtype(20), pattern_dtype(21)
+    (dtype('uint32'), dtype('uint64'))
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if 3**length <= 2 ** (8 * np.dtype(dtype).itemsize):
+            return np.dtype(dtype)
+    raise ValueError(f"The pattern codes of {length} letter words don't fit in 64 bits")
+
+
+def score_guess(guess, answer):
+    """
+    Computes the pattern code of a single guess without any precomputed table
+
+    :param guess: The word guessed
+    :type guess: string
+    :param answer: The word to compare against
+    :type answer: string
+    :return: The pattern code
+    :rtype: int
+
+    >>> decode_pattern(score_guess("allay", "llama"))
+    ['y', 'g', 'y', 'y', 'b']
+    >>> decode_pattern(score_guess("melee", "delve"))
+    ['b', 'g', 'g', 'b', 'g']
+    """
+    digits = [BLACK] * len(guess)
+    available = {}
+    for index, (i, j) in enumerate(zip(guess, answer)):
+        if i == j:
+            digits[index] = GREEN
+        else:
+            available[j] = available.get(j, 0) + 1
+    for index, i in enumerate(guess):
+        if digits[index] != GREEN and available.get(i, 0):
+            digits[index] = YELLOW
+            available[i] -= 1
+    code = 0
+    for digit in reversed(digits):
+        code = code * 3 + digit
+    return code
+
+
+def words_to_array(wordlist, length=None):
+    """
+    Packs a list of words into an N by length array of letter bytes
+
+    :param wordlist: The words to pack, all of the same length
+    :type wordlist: list of strings
+    :param length: The length of the words, taken from the first word if not given
+    :type length: int
+    :return: The packed words
+    :rtype: numpy.ndarray
+    """
+    if hasattr(wordlist, "packed"):
+        # A WordView from wordmake_store is already packed.
+        return np.asarray(wordlist.packed)
+    if length is None:
+        length = len(wordlist[0]) if wordlist else 0
+    packed = "".join(wordlist).encode("ascii")
+    return np.frombuffer(packed, dtype=np.uint8).reshape(len(wordlist), length)
+
+
+class PackedIndex(Mapping):
+    """
+    A read-only mapping from word to row over an N by length array of letter
+    bytes. The rows are ordered once with an argsort and each lookup is a binary
+    search, so no string or dictionary entry is built per word, and an array in
+    shared memory is used where it is.
+
+    >>> index = PackedIndex(words_to_array(["delve", "arose", "alamo"]))
+    >>> index["arose"], index.get("llama"), "alamo" in index, index.get("ARÖSE")
+    (1, None, True, None)
+    >>> list(index)
+    ['delve', 'arose', 'alamo']
+    """
+
+    def __init__(self, packed):
+        self.packed = packed
+        self.width = packed.shape[1]
+        self.keys = np.asarray(packed).view(f"S{self.width}").reshape(-1)
+        self.order = np.argsort(self.keys, kind="stable")
+
+    def __getitem__(self, word):
+        if not isinstance(word, str) or len(word) != self.width or not word.isascii():
+            raise KeyError(word)
+        key = word.encode("ascii")
+        found = np.searchsorted(self.keys, key, sorter=self.order)
+        if found < len(self.order) and self.keys[self.order[found]] == key:
+            return int(self.order[found])
+        raise KeyError(word)
+
+    def __iter__(self):
+        raw = np.asarray(self.packed).tobytes().decode("ascii")
+        return (raw[i : i + self.width] for i in range(0, len(raw), self.width or 1))
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def word_positions(words):
+    """
+    Returns the mapping from each word to its position, a PackedIndex over the
+    letter bytes of a WordView from wordmake_store and a dictionary otherwise
+
+    :param words: The words
+    :type words: list of strings or wordmake_store.WordView
+    :rtype: Mapping
+    """
+    if hasattr(words, "packed"):
+        return PackedIndex(words.packed)
+    return {word: index for index, word in enumerate(words)}
+
+
+def joined_bytes(words):
+    """
+    Returns the words joined by newlines, as ASCII bytes
+
+    >>> joined_bytes(["arose", "delve"])
+    b'arose\\ndelve'
+    """
+    if not hasattr(words, "packed"):
+        return "\n".join(words).encode("utf-8")
+    packed = np.asarray(words.packed)
+    rows = np.full((packed.shape[0], packed.shape[1] + 1), ord("\n"), dtype=np.uint8)
+    rows[:, :-1] = packed
+    return rows.tobytes()[:-1]
+
+
+def compute_patterns(guesses, answers, chunk_size=256):
+    """
+    Computes the pattern code of every guess against every answer
+
+    The work is done a block of guesses at a time with array operations, so no
+    Python code runs per (guess, answer) pair.
+
+    :param guesses: The packed guess words
+    :type guesses: numpy.ndarray
+    :param answers: The packed answer words
+    :type answers: numpy.ndarray
+    :param chunk_size: How many guesses to evaluate per block
+    :type chunk_size: int
+    :return: A guesses by answers array of pattern codes
+    :rtype: numpy.ndarray
+
+    >>> table = compute_patterns(words_to_array(["allay", "arose"]),
+    ...                          words_to_array(["llama", "arose"]))
+    >>> decode_pattern(table[0, 0])
+    ['y', 'g', 'y', 'y', 'b']
+    >>> int(table[1, 1])
+    242
+    >>> long = words_to_array(["abcdefghijklmnopqrstuv"])
+    >>> int(compute_patterns(long, long)[0, 0]) == 3**22 - 1
+    True
+    """
+    length = guesses.shape[1]
+    dtype = pattern_dtype(length)
+    weights = 3 ** np.arange(length, dtype=np.uint64)
+    if dtype.itemsize < 8:
+        weights = weights.astype(np.uint32)
+    table = np.empty((guesses.shape[0], answers.shape[0]), dtype=dtype)
+    for start in range(0, guesses.shape[0], chunk_size):
+        digits = _block_digits(guesses[start : start + chunk_size], answers)
+        table[start : start + chunk_size] = (digits @ weights).astype(dtype)
+    return table
+
+
+def _block_digits(guesses, answers):
+    """
+    Computes the per-letter status of a block of guesses against every answer
+    """
+    length = guesses.shape[1]
+    block = guesses[:, np.newaxis, :]
+    ans = answers[np.newaxis, :, :]
+    green = block == ans
+    digits = np.where(green, GREEN, BLACK).astype(np.uint8)
+    for i in range(length):
+        letter = block[:, :, i]
+        available = np.zeros(green.shape[:2], dtype=np.uint8)
+        for k in range(length):
+            available += (ans[:, :, k] == letter) & ~green[:, :, k]
+        used = np.zeros_like(available)
+        for j in range(i):
+            used += (block[:, :, j] == letter) & ~green[:, :, j]
+        digits[:, :, i][~green[:, :, i] & (used < available)] = YELLOW
+    return digits
+
+
+@lru_cache(maxsize=None)
+def decode_table(length=5):
+    """
+    Returns the decoded feedback result of every pattern code for a word length
+
+    :param length: The number of letters in the word
+    :type length: int
+    :return: The status tuple of each pattern code, indexed by code
+    :rtype: tuple of tuples of strings
+    """
+    return tuple(tuple(decode_pattern(code, length)) for code in range(3**length))
+
+
+@lru_cache(maxsize=None)
+def position_table(length=5):
+    """
+    Returns, for every pattern code, the positions that came back green,
+    yellow and black, so applying a result needs no decoding
+
+    :param length: The number of letters in the word
+    :type length: int
+    :return: The (greens, yellows, blacks) position tuples of each pattern code,
+        indexed by code
+    :rtype: tuple of tuples
+
+    >>> position_table()[encode_pattern("bgyyb")]
+    ((1,), (2, 3), (0, 4))
+    """
+    table = []
+    for statuses in decode_table(length):
+        table.append(
+            tuple(
+                tuple(num for num, status in enumerate(statuses) if status == letter)
+                for letter in "gyb"
+            )
+        )
+    return tuple(table)
+
+
+@lru_cache(maxsize=65536)
+def pattern_positions(code, length=5):
+    """
+    Returns the positions that came back green, yellow and black in a pattern
+    code, from position_table for short words and decoded from the code otherwise
+
+    :param code: The pattern code
+    :type code: int
+    :param length: The number of letters in the word
+    :type length: int
+    :return: The (greens, yellows, blacks) position tuples
+    :rtype: tuple of tuples
+
+    >>> pattern_positions(encode_pattern("bgyyb"))
+    ((1,), (2, 3), (0, 4))
+    >>> pattern_positions(encode_pattern("gbyggbbbbbbbby"), 14)
+    ((0, 3, 4), (2, 13), (1, 5, 6, 7, 8, 9, 10, 11, 12))
+    """
+    if length <= POSITION_TABLE_LENGTH:
+        return position_table(length)[code]
+    groups = ([], [], [])
+    code = int(code)
+    for num in range(length):
+        code, digit = divmod(code, 3)
+        groups[GREEN - digit].append(num)
+    return tuple(tuple(i) for i in groups)
+
+
+def wordlist_hash(guesses, answers=None):
+    """
+    Hashes the guess and answer lists into a key for the on-disk cache
+
+    :param guesses: The words that may be guessed
+    :type guesses: list of strings
+    :param answers: The words that may be the answer, the guesses if not given
+    :type answers: list of strings
+    :return: A hex digest identifying the lists
+    :rtype: string
+    """
+    digest = hashlib.sha1()
+    digest.update(joined_bytes(guesses))
+    if answers is not None and answers is not guesses:
+        digest.update(b"\0")
+        digest.update(joined_bytes(answers))
+    return digest.hexdigest()
+
+
+def default_cache_dir():
+    """
+    Returns the directory for the on-disk caches, honoring WORDLE_BOT_CACHE
+
+    :return: The cache directory
+    :rtype: string
+    """
+    return os.environ.get(
+        "WORDLE_BOT_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "wordle_bot")
+    )
+
+
+class FeedbackMatrix:  # pylint: disable=too-many-instance-attributes
+    """
+    The FeedbackMatrix holds the pattern code of every guess against every answer
+
+    The table is stored in the cache directory under the hash of the wordlists
+    and memory-mapped, so building it is only paid for once per wordlist.
+    The guesses and the answers may be different lists, as with a large list of
+    allowed guesses and a smaller one of possible answers.
+    """
+
+    def __init__(self, guesses, answers=None, cache_dir=None):
+        # A WordView from wordmake_store is kept as it is, and its lookups are
+        # searches over its letter bytes instead of dictionaries of strings.
+        self.guesses = guesses if hasattr(guesses, "packed") else list(guesses)
+        if answers is None:
+            self.answers = self.guesses
+        else:
+            self.answers = answers if hasattr(answers, "packed") else list(answers)
+        # The list the answers were given as, which Wordler.get_index indexes too.
+        self.answer_source = guesses if answers is None else answers
+        self.length = len(self.guesses[0]) if len(self.guesses) else 5
+        self.guess_index = word_positions(self.guesses)
+        self.answer_index = (
+            self.guess_index if self.answers is self.guesses else word_positions(self.answers)
+        )
+        self.cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+        self.matrix = self._load_or_build(
+            self.cache_path(),
+            (len(self.guesses), len(self.answers)),
+            lambda: compute_patterns(
+                words_to_array(self.guesses, self.length),
+                words_to_array(self.answers, self.length),
+            ),
+        )
+        self.by_answer = None
+
+    def answer_major(self):
+        """
+        Returns the table transposed to answers by guesses, memory-mapped from its
+        own file next to the table and built on first use. Scoring every guess
+        against a few candidates then reads one row per candidate instead of a
+        column scattered over the table
+
+        :return: The answer by guess pattern table
+        :rtype: numpy.ndarray
+        """
+        if self.by_answer is None:
+            self.by_answer = self._load_or_build(
+                self.cache_path("-by-answer"),
+                self.matrix.shape[::-1],
+                lambda: np.ascontiguousarray(self.matrix.T),
+            )
+        return self.by_answer
+
+    def cache_path(self, suffix=""):
+        """
+        Returns the path of the cached table for these wordlists
+        """
+        key = wordlist_hash(
+            self.guesses, None if self.answers is self.guesses else self.answers
+        )
+        return os.path.join(self.cache_dir, f"feedback-{key}{suffix}.npy")
+
+    def _load_or_build(self, path, shape, build):
+        """
+        Memory-maps a cached table, building and saving it first if needed
+        """
+        if os.path.exists(path):
+            try:
+                matrix = np.load(path, mmap_mode="r")
+                if matrix.shape == shape:
+                    return matrix
+            except ValueError:
+                pass
+        matrix = build()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as fileout:
+                np.save(fileout, matrix)
+            os.replace(temp_path, path)
+        except OSError:
+            return matrix
+        return np.load(path, mmap_mode="r")
+
+    def lookup(self, guess, answer):
+        """
+        Returns the pattern code of one guess against one answer
+
+        :param guess: The word guessed
+        :type guess: string
+        :param answer: The word to compare against
+        :type answer: string
+        :return: The pattern code
+        :rtype: int
+        """
+        row = self.guess_index.get(guess)
+        col = self.answer_index.get(answer)
+        if row is None or col is None:
+            return score_guess(guess, answer)
+        return int(self.matrix[row, col])
+
+    def lookup_many(self, guess, answers=None):
+        """
+        Returns the pattern codes of one guess against many answers
+
+        :param guess: The word guessed
+        :type guess: string
+        :param answers: The words or answer indices to compare against, all if not given
+        :type answers: list of strings or numpy.ndarray of ints
+        :return: The pattern codes, in the order of *answers*
+        :rtype: numpy.ndarray
+        """
+        row = self.guess_index.get(guess)
+        if row is None:
+            words = self.answers if answers is None else answers
+            if isinstance(words, np.ndarray):
+                words = [self.answers[i] for i in words]
+            return np.array(
+                [score_guess(guess, i) for i in words],
+                dtype=self.matrix.dtype,
+            )
+        if answers is None:
+            return np.asarray(self.matrix[row])
+        if not isinstance(answers, np.ndarray):
+            answers = np.fromiter(
+                (self.answer_index[i] for i in answers), dtype=np.intp, count=len(answers)
+            )
+        return self.matrix[row, answers]
+
+    def evaluate(self, guess, answer):
+        """
+        An evaluator for Wordler.eval_word that reads results from the table
+
+        :param guess: The word guessed
+        :type guess: string
+        :param answer: The word to compare against
+        :type answer: string
+        :return: The pattern code
+        :rtype: int
+        """
+        return self.lookup(guess, answer)
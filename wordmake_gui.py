@@ -1,10 +1,21 @@
 """
 The GUI module for wordmake
+
+The window is shown before the wordlist is loaded. Loading and every solver
+step run in a worker thread, and their results are picked up on the Tk event
+loop by polling with after(), so the window never freezes. The buttons are
+disabled and the progress bar runs while a computation is in flight.
 """
+import queue
+import threading
 import tkinter as tk
-from collections import Counter
+from tkinter import ttk
 import wordmake
+import wordmake_feedback
+import wordmake_policy
 
+STARTINGWORDS = ["clamp", "berth"]
+POLL_MS = 50
 
 window = tk.Tk()
 window["bg"] = "black"
@@ -50,78 +61,177 @@ for y in range(6):
     # we need the second block to end at 170 and start at 120 and the first
     # to end at 115 and start at 65
 
-my_wordler = wordmake.Wordler(verbosity=0)
-my_wordler.add_wordlist(filename="/usr/share/dict/words")
-my_wordler.game_attrs["game_list"] = my_wordler.wordlist
-my_wordler.counter = Counter([j for i in my_wordler.game_attrs["game_list"] for j in i])
-
 color_map = {"gray": "b", "#538d4e": "g", "#b59f3b": "y"}
 letter_list = []
+state = {"wordler": None, "busy": False}
+results = queue.Queue()
 
 
-def gui_evaluate(_, __):
+def load_wordler():
     """
-    Gets guess correctness from the rectangle colors
+    Builds the Wordler, its letter counts and its policy. Runs in the worker thread.
     """
-    outlist = []
-    curr_row = my_wordler.game_attrs["guess_count"]
-    for i in rectangles[curr_row - 1]:
-        outlist.append(color_map[canvas.itemcget(i, "fill")])
-    return outlist
+    wordler = wordmake.Wordler(verbosity=0)
+    wordler.add_wordlist(filename="/usr/share/dict/words")
+    wordler.reset()
+    wordler.load_policy(
+        wordmake_policy.cached_policy(wordler.wordlist, STARTINGWORDS, build=False)
+    )
+    return wordler
 
 
-def makeguess_gui():
+def run_in_background(work, done, message):
     """
-    Computer makes a guess and displays it to the GUI
+    Runs *work* in a worker thread and then *done* with its result on the Tk
+    event loop, keeping the buttons disabled and the progress bar running meanwhile
+
+    :param work: The computation, which must not touch any widget
+    :type work: function
+    :param done: Called with the result of *work* once it has finished
+    :type done: function
+    :param message: The status text to show while working
+    :type message: string
     """
-    curr_row = my_wordler.game_attrs["guess_count"]
-    if curr_row == 6:
-        return None
-    if curr_row:
-        my_wordler.eval_word(gui_evaluate)
-        my_wordler.update_gamestate()
-        if my_wordler.game_attrs["game_over"]:
+    state["busy"] = True
+    guess_btn.configure(state=tk.DISABLED)
+    reset_btn.configure(state=tk.DISABLED)
+    status.configure(text=message)
+    progress.start(10)
+
+    def worker():
+        try:
+            results.put((done, work(), None))
+        except Exception as error:  # pylint: disable=broad-except
+            results.put((done, None, error))
+
+    threading.Thread(target=worker, daemon=True).start()
+    window.after(POLL_MS, poll_results)
+
+
+def poll_results():
+    """
+    Hands a finished computation's result to its callback, or checks again later
+    """
+    try:
+        done, result, error = results.get_nowait()
+    except queue.Empty:
+        window.after(POLL_MS, poll_results)
+        return
+    progress.stop()
+    state["busy"] = False
+    guess_btn.configure(state=tk.NORMAL)
+    reset_btn.configure(state=tk.NORMAL)
+    status.configure(text="")
+    if error is not None:
+        status.configure(text=str(error) or type(error).__name__)
+        if state["wordler"] is None:
+            guess_btn.configure(state=tk.DISABLED)
+            reset_btn.configure(state=tk.DISABLED)
+        return
+    done(result)
+
+
+def wordler_loaded(wordler):
+    """
+    Stores the loaded Wordler
+    """
+    state["wordler"] = wordler
+
+
+def read_row(row):
+    """
+    Gets guess correctness from the rectangle colors of a row, as a pattern code
+    """
+    return wordmake_feedback.encode_pattern(
+        [color_map[canvas.itemcget(i, "fill")] for i in rectangles[row]]
+    )
+
+
+def solver_step(wordler, result):
+    """
+    Evaluates the last guess with the colors read from the GUI and makes the next
+    guess. Runs in the worker thread.
+
+    :return: The next guess, or None if the game is over or no words remain
+    :rtype: string or None
+    """
+    if result is not None:
+        wordler.eval_word(lambda _, __: result)
+        wordler.update_gamestate()
+        if wordler.game_attrs["game_over"]:
             return None
     try:
-        guess_word = my_wordler.make_guess(startingwords=["clamp", "berth"])
-        for index, i in enumerate(guess_word):
-            letter_id = canvas.create_text(
-                93 + index * 55,
-                128 + curr_row * 55,
-                text=i.upper(),
-                fill="white",
-                font=("Arial", 18, "bold"),
-            )
-            letter_list.append(letter_id)
-            canvas.tag_bind(
-                rectangles[curr_row][index],
-                "<Button-1>",
-                lambda event, id=rectangles[curr_row][index]: change_color(id),
-            )
+        return wordler.make_guess(startingwords=STARTINGWORDS)
     except wordmake.NoWordsLeftException:
         print("Can't print a word if none remain")
-    return None
+        return None
+
+
+def makeguess_gui():
+    """
+    Computer makes a guess and displays it to the GUI
+    """
+    wordler = state["wordler"]
+    if state["busy"] or wordler is None:
+        return
+    curr_row = wordler.game_attrs["guess_count"]
+    if curr_row == 6:
+        return
+    # The colors are read here, since only the Tk thread may touch the canvas.
+    result = read_row(curr_row - 1) if curr_row else None
+    run_in_background(
+        lambda: solver_step(wordler, result),
+        lambda guess_word: show_guess(guess_word, curr_row),
+        "Thinking...",
+    )
 
 
-def reset(wordler):
+def show_guess(guess_word, curr_row):
+    """
+    Draws a guess on a row and makes the row's rectangles clickable
+    """
+    if guess_word is None:
+        return
+    for index, i in enumerate(guess_word):
+        letter_id = canvas.create_text(
+            93 + index * 55,
+            128 + curr_row * 55,
+            text=i.upper(),
+            fill="white",
+            font=("Arial", 18, "bold"),
+        )
+        letter_list.append(letter_id)
+        canvas.tag_bind(
+            rectangles[curr_row][index],
+            "<Button-1>",
+            lambda event, id=rectangles[curr_row][index]: change_color(id),
+        )
+
+
+def reset():
     """
     Resets GUI
     """
+    if state["busy"] or state["wordler"] is None:
+        return
     for i in rectangles:
         for j in i:
             canvas.itemconfig(j, fill="gray")
-            canvas.tag_unbind(id, "<Button-1>")
+            canvas.tag_unbind(j, "<Button-1>")
     for i in letter_list:
         canvas.delete(i)
-    wordler.reset()
+    letter_list.clear()
+    state["wordler"].reset()
 
 
 guess_btn = tk.Button(window, text="Make a guess", command=makeguess_gui)
 guess_btn.pack()
-reset_btn = tk.Button(
-    window, text="Reset", command=lambda wordler=my_wordler: reset(wordler)
-)
+reset_btn = tk.Button(window, text="Reset", command=reset)
 reset_btn.pack()
+progress = ttk.Progressbar(window, mode="indeterminate", length=200)
+progress.pack(pady=4)
+status = tk.Label(window, text="", fg="white", bg="black")
+status.pack()
 
-
+run_in_background(load_wordler, wordler_loaded, "Loading wordlist...")
 tk.mainloop()
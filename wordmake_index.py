@@ -0,0 +1,452 @@
+"""
+Wordmake_index compiles a wordlist into bitsets so that candidate filtering is
+a handful of bitwise operations instead of a loop over every word.
+
+A candidate set is a plain Python int whose bit *n* is set when word *n* of the
+wordlist is still possible.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import wordmake_feedback
+
+# How many wordlists shared_index keeps an index for.
+SHARED_INDEXES = 8
+
+_shared_indexes = OrderedDict()
+_shared_lock = threading.Lock()
+
+
+def bits_from_mask(mask):
+    """
+    Packs a boolean array into a bitset
+
+    :param mask: Whether each word is in the set
+    :type mask: numpy.ndarray
+    :return: The bitset
+    :rtype: int
+
+    >>> bin(bits_from_mask(np.array([True, False, True])))
+    '0b101'
+    """
+    return int.from_bytes(
+        np.packbits(np.asarray(mask, dtype=bool), bitorder="little").tobytes(),
+        "little",
+    )
+
+
+def bits_to_indices(bits, size):
+    """
+    Unpacks a bitset into the ascending indices of its members
+
+    :param bits: The bitset
+    :type bits: int
+    :param size: The number of words the bitset covers
+    :type size: int
+    :return: The indices of the set bits
+    :rtype: numpy.ndarray
+
+    >>> bits_to_indices(0b101, 3).tolist()
+    [0, 2]
+    """
+    packed = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(packed, count=size, bitorder="little"))
+
+
+def build_trie(words):
+    """
+    Builds a prefix trie of a wordlist as nested dictionaries keyed by letter,
+    where the empty string marks the end of a word
+
+    :param words: The words to index
+    :type words: list of strings
+    :return: The root of the trie
+    :rtype: dictionary
+
+    >>> trie = build_trie(["arose", "alamo"])
+    >>> sorted(trie["a"]), "" in trie["a"]["l"]["a"]["m"]["o"]
+    (['l', 'r'], True)
+    """
+    root = {}
+    for word in words:
+        node = root
+        for letter in word:
+            node = node.setdefault(letter, {})
+        node[""] = True
+    return root
+
+
+class WordIndex:  # pylint: disable=too-many-instance-attributes
+    """
+    The WordIndex holds one bitset per (position, letter) pair and one per
+    "contains the letter at least k times", built once per wordlist
+
+    >>> index = WordIndex(["arose", "alamo", "delve"])
+    >>> index.materialize(index.at_position[0]["a"])
+    ['arose', 'alamo']
+    >>> index.materialize(index.at_least["a"][1])
+    ['alamo']
+    """
+
+    def __init__(self, wordlist):
+        self.source = wordlist
+        # A WordView from wordmake_store is already packed and is kept as it is.
+        self.words = wordlist if hasattr(wordlist, "take") else list(wordlist)
+        length = len(self.words[0]) if len(self.words) else 0
+        self.positions = wordmake_feedback.word_positions(self.words)
+        self.full = (1 << len(self.words)) - 1
+        self.at_position = [{} for _ in range(length)]
+        self.at_least = {}
+        if hasattr(wordlist, "packed"):
+            packed = np.asarray(wordlist.packed)
+        else:
+            packed = wordmake_feedback.words_to_array(self.words, length)
+        letter_codes, self.codes = np.unique(packed, return_inverse=True)
+        self.codes = self.codes.reshape(packed.shape)
+        self.alphabet = [chr(code) for code in letter_codes]
+        self.columns = {letter: column for column, letter in enumerate(self.alphabet)}
+        self.word_counts = np.zeros((len(self.words), len(self.alphabet)), dtype=np.int64)
+        for column, letter in enumerate(self.alphabet):
+            matches = self.codes == column
+            for pos in range(length):
+                if matches[:, pos].any():
+                    self.at_position[pos][letter] = bits_from_mask(matches[:, pos])
+            counts = self.word_counts[:, column] = matches.sum(axis=1)
+            self.at_least[letter] = [
+                bits_from_mask(counts >= k) for k in range(1, int(counts.max()) + 1)
+            ]
+        self.total_counts = self.word_counts.sum(axis=0)
+        self.distinct = (self.word_counts > 0).astype(np.float64)
+        self.prefixes = None
+
+    def trie(self):
+        """
+        Returns the prefix trie of the wordlist (see build_trie), building it on first use
+        """
+        if self.prefixes is None:
+            self.prefixes = build_trie(self.words)
+        return self.prefixes
+
+    def contains(self, letter):
+        """
+        Returns the bitset of words containing the letter at least once
+
+        :param letter: The letter to look for
+        :type letter: string
+        :return: The bitset
+        :rtype: int
+        """
+        counts = self.at_least.get(letter)
+        return counts[0] if counts else 0
+
+    def bits_for(self, words):
+        """
+        Converts a list of words into a bitset over this index
+
+        :param words: The words to convert
+        :type words: list of strings
+        :return: The bitset, or None if a word is unknown or the list is out of order
+        :rtype: int or None
+        """
+        if words is self.source:
+            return self.full
+        bits = 0
+        last = -1
+        for word in words:
+            position = self.positions.get(word)
+            if position is None or position <= last:
+                return None
+            bits |= 1 << position
+            last = position
+        return bits
+
+    def constraint_mask(self, checked_letters):
+        """
+        Builds the bitset of words consistent with every previous guess result,
+        following the same rules as Wordler.validate_word
+
+        :param checked_letters: The greens, yellows and blacks dictionaries
+        :type checked_letters: namedtuple
+        :return: The bitset of legal words
+        :rtype: int
+        """
+        mask = self.full
+        greens, yellows, blacks = checked_letters
+        for letter, pos in blacks.items():
+            if letter not in yellows and letter not in greens:
+                mask &= ~self.contains(letter)
+            else:
+                for num in pos:
+                    mask &= ~self.at_position[num].get(letter, 0)
+        for letter, pos in yellows.items():
+            mask &= self.contains(letter)
+            for num in pos:
+                mask &= ~self.at_position[num].get(letter, 0)
+        for letter, pos in greens.items():
+            for num in pos:
+                mask &= self.at_position[num].get(letter, 0)
+        return mask
+
+    def filter(self, bits, checked_letters):
+        """
+        Removes the words that are no longer legal from a candidate set
+
+        :param bits: The candidate set
+        :type bits: int
+        :param checked_letters: The greens, yellows and blacks dictionaries
+        :type checked_letters: namedtuple
+        :return: The filtered candidate set
+        :rtype: int
+        """
+        return bits & self.constraint_mask(checked_letters)
+
+    def materialize(self, bits):
+        """
+        Converts a bitset into the list of its words, in wordlist order
+
+        :param bits: The candidate set
+        :type bits: int
+        :return: The words in the set
+        :rtype: list of strings
+        """
+        if bits == self.full:
+            return self.source
+        chosen = bits_to_indices(bits, len(self.words))
+        if hasattr(self.words, "take"):
+            return self.words.take(chosen)
+        return [self.words[i] for i in chosen]
+
+
+def shared_index(wordlist):
+    """
+    Returns the WordIndex of a wordlist, shared by every caller passing the same
+    list, so that Wordlers created one per game build it only once. The indexes
+    of the most recently used wordlists are kept
+
+    :param wordlist: The wordlist to index
+    :type wordlist: list of strings
+    :rtype: WordIndex
+
+    >>> words = ["arose", "alamo", "delve"]
+    >>> shared_index(words) is shared_index(words)
+    True
+    >>> shared_index(words) is shared_index(list(words))
+    False
+    """
+    with _shared_lock:
+        index = _shared_indexes.get(id(wordlist))
+        # The index keeps its wordlist alive, so a matching id is the same list.
+        if index is None or index.source is not wordlist:
+            index = WordIndex(wordlist)
+            _shared_indexes[id(wordlist)] = index
+            if len(_shared_indexes) > SHARED_INDEXES:
+                _shared_indexes.popitem(last=False)
+        _shared_indexes.move_to_end(id(wordlist))
+        return index
+
+
+class LetterCounts:
+    """
+    The LetterCounts keeps the letter and per-position letter frequencies of a
+    candidate set. Moving to a new candidate set only touches the words that were
+    removed or added, and it answers the same queries as the Counter of every
+    letter of every candidate, with the same ordering for ties.
+
+    >>> index = WordIndex(["arose", "alamo", "delve"])
+    >>> counts = LetterCounts(index)
+    >>> counts.most_common(3)
+    [('a', 3), ('e', 3), ('o', 2)]
+    >>> counts.update(index.bits_for(["alamo", "delve"]))
+    >>> counts["e"], counts["r"], len(counts)
+    (2, 0, 7)
+    """
+
+    def __init__(self, index, candidates=None):
+        self.index = index
+        self.candidates = index.full if candidates is None else candidates
+        if self.candidates == index.full:
+            self.counts = index.total_counts.copy()
+            chosen = slice(None)
+        else:
+            chosen = bits_to_indices(self.candidates, len(index.words))
+            self.counts = index.word_counts[chosen].sum(axis=0)
+        self.position_counts = np.zeros(
+            (len(index.alphabet), index.codes.shape[1]), dtype=np.int64
+        )
+        for pos in range(index.codes.shape[1]):
+            self.position_counts[:, pos] = np.bincount(
+                index.codes[chosen, pos], minlength=len(index.alphabet)
+            )
+        self.order = None
+
+    def _apply(self, bits, sign):
+        """
+        Adds (sign 1) or removes (sign -1) the words of a bitset from the counts
+        """
+        chosen = bits_to_indices(bits, len(self.index.words))
+        self.counts += sign * self.index.word_counts[chosen].sum(axis=0)
+        for pos in range(self.index.codes.shape[1]):
+            self.position_counts[:, pos] += sign * np.bincount(
+                self.index.codes[chosen, pos], minlength=len(self.index.alphabet)
+            )
+
+    def update(self, candidates):
+        """
+        Moves the counts to a new candidate set
+
+        :param candidates: The new candidate set
+        :type candidates: int
+        """
+        removed = self.candidates & ~candidates
+        added = candidates & ~self.candidates
+        if removed:
+            self._apply(removed, -1)
+        if added:
+            self._apply(added, 1)
+        self.candidates = candidates
+        self.order = None
+
+    def _first_seen(self, letter):
+        """
+        Returns where the letter first appears when reading the candidates in order
+        """
+        members = self.candidates & self.index.contains(letter)
+        first = (members & -members).bit_length() - 1
+        word = self.index.words[first]
+        return first * len(word) + word.index(letter)
+
+    def most_common(self, n=None):
+        """
+        Returns the n most common letters and their counts, like Counter.most_common
+
+        :param n: How many letters to return, all of them if not given
+        :type n: int
+        :return: The letters and their counts, most common first
+        :rtype: list of tuples
+        """
+        if self.order is None:
+            present = [
+                (letter, int(self.counts[column]))
+                for column, letter in enumerate(self.index.alphabet)
+                if self.counts[column]
+            ]
+            present.sort(key=lambda item: self._first_seen(item[0]))
+            present.sort(key=lambda item: item[1], reverse=True)
+            self.order = present
+        return list(self.order) if n is None else self.order[:n]
+
+    def position_count(self, letter, pos):
+        """
+        Returns how many candidates have the letter at the given position
+        """
+        column = self.index.columns.get(letter)
+        return 0 if column is None else int(self.position_counts[column, pos])
+
+    def __getitem__(self, letter):
+        column = self.index.columns.get(letter)
+        return 0 if column is None else int(self.counts[column])
+
+    def __len__(self):
+        return int(np.count_nonzero(self.counts))
+
+
+def suggest_word(index, candidates, counter, depth, lookahead=True):
+    """
+    Picks the same word as the recursive Wordler.wordsuggest, without recursing.
+
+    Each candidate is ranked by the least common of its letters, so the words
+    allowed at depth *d* (all letters among the top *d*) are a prefix of one
+    sorted order. Running maxima over that order give the best word of every
+    depth at once, and the deeper levels are then folded back the same way the
+    recursion would unwind them.
+
+    :param index: The index of the wordlist
+    :type index: WordIndex
+    :param candidates: The candidate set
+    :type candidates: int
+    :param counter: The letter frequencies of the candidates
+    :type counter: LetterCounts or collections.Counter
+    :param depth: The top *depth* most common letters will be considered first
+    :type depth: int
+    :param lookahead: Whether words with repeated letters may be replaced by deeper picks
+    :type lookahead: bool
+    :return: The best word to guess, or None if no word can be suggested
+    :rtype: string or None
+
+    >>> index = WordIndex(["arose", "alamo", "delve"])
+    >>> counts = LetterCounts(index)
+    >>> suggest_word(index, index.full, counts, 5)
+    'arose'
+    >>> counts.update(index.bits_for(["alamo", "delve"]))
+    >>> suggest_word(index, counts.candidates, counts, 5)
+    'alamo'
+    """
+    return suggest_word_depth(index, candidates, counter, depth, lookahead)[0]
+
+
+def suggest_word_depth(  # pylint: disable=too-many-locals
+    index, candidates, counter, depth, lookahead=True
+):
+    """
+    The body of suggest_word, also returning the deepest level the recursion
+    would have reached
+
+    :return: The best word to guess or None, and the final depth
+    :rtype: tuple
+
+    >>> index = WordIndex(["arose", "alamo", "delve"])
+    >>> suggest_word_depth(index, index.full, LetterCounts(index), 5)
+    ('arose', 6)
+    """
+    letters = len(counter)
+    chosen = bits_to_indices(candidates, len(index.words))
+    scores, needed = _score_candidates(index, chosen, counter)
+    order = np.argsort(needed, kind="stable")
+    size = len(chosen) + 1
+    best = np.maximum.accumulate(scores[order] * size + (size - 1 - order))
+    last = np.maximum.accumulate(order)
+    needed = needed[order]
+
+    pending = []
+    while True:
+        if depth > letters + 5:
+            return None, depth
+        allowed = int(np.searchsorted(needed, depth))
+        if not allowed:
+            depth += 1
+            continue
+        pick = size - 1 - int(best[allowed - 1] % size)
+        word = index.words[chosen[pick]]
+        if not (len(set(word)) < len(word) and lookahead and depth < letters):
+            break
+        pending.append((pick, int(scores[last[allowed - 1]])))
+        depth += 1
+    for fallback, count in reversed(pending):
+        if scores[pick] <= count:
+            pick = fallback
+    return index.words[chosen[pick]], depth
+
+
+def _score_candidates(index, chosen, counter):
+    """
+    Returns the letter frequency score of each chosen word and the rank of its
+    least common letter
+    """
+    letters = len(counter)
+    # Every letter gets two weights: its count, which sums to the word score,
+    # and 2 ** rank, whose highest set bit is the rank of the rarest letter.
+    weights = np.zeros((len(index.alphabet), 2))
+    weights[:, 1] = 2.0 ** (letters + 6)
+    for place, (letter, count) in enumerate(counter.most_common()):
+        column = index.columns.get(letter)
+        if column is not None:
+            weights[column] = count, 2.0**place
+    if len(chosen) * 4 < len(index.words):
+        totals = index.distinct[chosen] @ weights
+    else:
+        totals = (index.distinct @ weights)[chosen]
+    needed = (np.frexp(totals[:, 1])[1] - 1).astype(np.int16)
+    return totals[:, 0].astype(np.int64), needed
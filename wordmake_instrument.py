@@ -0,0 +1,216 @@
+"""
+Wordmake_instrument measures where the time of a Wordler's game goes.
+
+A Wordler with a sink in its instrument member hands the sink one record per
+turn: the time of each phase, the candidate count before and after filtering,
+the depth wordsuggest reached and the evaluator's latency, then one record per
+game. Phases nest: make_guess includes wordsuggest, eval_word includes evaluator
+and gen_new_list, and update_gamestate includes refresh_counter. Without a sink
+the only cost is a None check per phase.
+
+profile_play runs a whole game under cProfile or tracemalloc.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from collections import Counter
+
+
+def timed(record, phase, func, *args):
+    """
+    Calls a function, adding its run time to a phase of the turn record
+
+    :param record: The current turn record, or None when not instrumenting
+    :type record: dict or None
+    :param phase: The phase name
+    :type phase: string
+    :param func: The function to call
+    :type func: function
+    :return: The function's return value
+
+    >>> record = {"phases": {}}
+    >>> timed(record, "sum", sum, [1, 2])
+    3
+    >>> list(record["phases"])
+    ['sum']
+    >>> timed(None, "sum", sum, [1, 2])
+    3
+    """
+    if record is None:
+        return func(*args)
+    start = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        phases = record["phases"]
+        phases[phase] = phases.get(phase, 0.0) + time.perf_counter() - start
+
+
+class MemorySink:
+    """
+    Aggregates turn records in memory: the call count, total and worst time of
+    every phase, the wordsuggest depths seen and the candidate counts. With
+    *keep* every record is kept in records as well.
+
+    >>> sink = MemorySink()
+    >>> sink.record({"event": "turn", "phases": {"make_guess": 0.5},
+    ...              "candidates_before": 10, "candidates_after": 2})
+    >>> sink.record({"event": "game", "guess_count": 1})
+    >>> summary = sink.summary()
+    >>> summary["turns"], summary["games"], summary["phases"]["make_guess"]["mean"]
+    (1, 1, 0.5)
+    """
+
+    def __init__(self, keep=False):
+        self.records = [] if keep else None
+        self.phases = {}
+        self.depths = Counter()
+        self.counts = Counter()
+
+    def record(self, event):
+        """
+        Adds one turn or game record
+        """
+        if self.records is not None:
+            self.records.append(event)
+        if event["event"] == "game":
+            self.counts["games"] += 1
+            self.counts["guesses"] += event["guess_count"]
+            return
+        self.counts["turns"] += 1
+        for phase, seconds in event["phases"].items():
+            stats = self.phases.setdefault(phase, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+        if event.get("suggest_depth") is not None:
+            self.depths[event["suggest_depth"]] += 1
+        if event.get("candidates_before") is not None:
+            self.counts["measured"] += 1
+            self.counts["before"] += event["candidates_before"]
+            self.counts["after"] += event["candidates_after"]
+
+    def summary(self):
+        """
+        Returns the aggregated measurements
+
+        :return: The turn and game counts, per phase count, total, mean and max
+            seconds, the wordsuggest depth histogram and the mean candidate counts
+        :rtype: dict
+        """
+        measured = self.counts["measured"] or 1
+        return {
+            "turns": self.counts["turns"],
+            "games": self.counts["games"],
+            "guesses": self.counts["guesses"],
+            "phases": {
+                phase: {
+                    "count": count,
+                    "total": total,
+                    "mean": total / count,
+                    "max": worst,
+                }
+                for phase, (count, total, worst) in self.phases.items()
+            },
+            "suggest_depth": dict(sorted(self.depths.items())),
+            "candidates_before": self.counts["before"] / measured,
+            "candidates_after": self.counts["after"] / measured,
+        }
+
+
+class JsonlSink:
+    """
+    Appends every record to a file as one line of JSON
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def record(self, event):
+        """
+        Writes one turn or game record
+        """
+        if self.file is None:
+            self.file = open(  # pylint: disable=consider-using-with
+                self.path, "a", encoding="utf-8"
+            )
+        self.file.write(json.dumps(event) + "\n")
+
+    def close(self):
+        """
+        Closes the file
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CallbackSink:  # pylint: disable=too-few-public-methods
+    """
+    Passes every record to a function
+
+    >>> seen = []
+    >>> CallbackSink(seen.append).record({"event": "game", "guess_count": 3})
+    >>> seen
+    [{'event': 'game', 'guess_count': 3}]
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def record(self, event):
+        """
+        Hands one turn or game record to the callback
+        """
+        self.callback(event)
+
+
+def profile_play(wordler, mode="cprofile", limit=20, **play_args):
+    """
+    Plays one game under a profiler
+
+    :param wordler: The Wordler to play with
+    :type wordler: wordmake.Wordler
+    :param mode: "cprofile" for a call profile, "tracemalloc" for memory use
+    :type mode: string
+    :param limit: The number of functions or source lines to report
+    :type limit: int
+    :param play_args: The arguments of Wordler.play
+    :return: The guess count and the profile report
+    :rtype: tuple
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        guess_count = profiler.runcall(wordler.play, **play_args)
+        report = io.StringIO()
+        stats = pstats.Stats(profiler, stream=report)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return guess_count, report.getvalue()
+    if mode == "tracemalloc":
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            guess_count = wordler.play(**play_args)
+            peak = tracemalloc.get_traced_memory()[1]
+            after = tracemalloc.take_snapshot()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+        lines = [f"Peak traced memory: {peak} bytes"]
+        lines.extend(str(i) for i in after.compare_to(before, "lineno")[:limit])
+        return guess_count, "\n".join(lines) + "\n"
+    raise ValueError(f"Unknown profiling mode {mode!r}")
@@ -0,0 +1,344 @@
+"""
+Wordmake_minimax finds how many guesses a starting word can guarantee.
+
+The averages in results.txt say nothing about the worst case, so this module
+searches the game tree exactly: a set of candidates can be solved within d
+guesses if some guess splits it into feedback groups that can each be solved
+within d - 1. The search is depth-first with several cuts:
+
+* a set no larger than d is always solvable, by guessing its words in turn,
+  and with two guesses left every group but the all-green one must be a
+  single word, which is checked for all guesses at once;
+* guesses that don't split the set are skipped, since they can never help;
+* guesses are tried in order of their largest group, and a guess is dropped as
+  soon as one of its groups, largest first, fails;
+* no guess splits a subset into more groups than the most any guess splits
+  the whole set into, which bounds the size of group the guesses left can solve;
+* results are kept in a transposition table keyed by a fingerprint of the
+  candidate set, so a set reached along many lines is searched only once.
+
+An exact search of the whole dictionary takes hours, so the search can be
+limited to the best few guesses at each step. Any guess count it finds is still
+guaranteed, since it comes with a strategy that reaches it, but it may not be
+the least possible, and a failure no longer proves that none exists.
+
+The table is bounded by a memory cap, and when it fills the oldest half is
+dropped. After the opener, its feedback groups are independent, so they are
+shared out across a pool of worker processes.
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+
+import numpy as np
+
+import wordmake_feedback
+import wordmake_store
+import wordmake_strategy
+
+DICTIONARY = "/usr/share/dict/words"
+# Rough size of one transposition table entry, key and value included.
+ENTRY_BYTES = 200
+
+_worker_state = {}
+
+
+class MinimaxSolver:  # pylint: disable=too-many-instance-attributes
+    """
+    The MinimaxSolver decides how many guesses sets of candidates need in the
+    worst case
+
+    :param feedback: The feedback table
+    :type feedback: wordmake_feedback.FeedbackMatrix
+    :param guesses: Which guesses to consider, "all" or only the "candidates"
+    :type guesses: string
+    :param memory_mb: The memory cap of the transposition table, in megabytes
+    :type memory_mb: int
+    :param width: How many of the best guesses to try at each step, all if not specified
+    :type width: int
+
+    >>> table = wordmake_feedback.FeedbackMatrix(["arose", "alamo", "delve", "llama"])
+    >>> solver = MinimaxSolver(table)
+    >>> solver.min_depth(np.arange(4), 4)
+    2
+    >>> solver.min_depth(np.arange(4), 1) is None
+    True
+    >>> sorted(table.answers[i] for i in solver.worst_answers(np.arange(4), 2))
+    ['alamo', 'delve', 'llama']
+    """
+
+    def __init__(self, feedback, guesses="all", memory_mb=256, width=None):
+        self.feedback = feedback
+        self.guesses = guesses
+        self.width = width
+        self.patterns = 3**feedback.length
+        self.solved_pattern = self.patterns - 1
+        self.max_entries = max(1, memory_mb * 2**20 // ENTRY_BYTES)
+        self.table = {}
+        self.nodes = 0
+        self.all_rows = np.arange(len(feedback.guesses))
+
+    def rows_for(self, answers):
+        """
+        Returns the guess rows to consider for a set of candidates
+        """
+        if self.guesses == "candidates":
+            rows = [self.feedback.guess_index.get(self.feedback.answers[i]) for i in answers]
+            return np.array([i for i in rows if i is not None], dtype=np.intp)
+        return self.all_rows
+
+    def min_depth(self, answers, limit):
+        """
+        Finds the fewest guesses that surely solve every answer in a set
+
+        :param answers: The candidate answer columns, sorted
+        :type answers: numpy.ndarray
+        :param limit: The most guesses to look for
+        :type limit: int
+        :return: The number of guesses, or None if it's more than *limit*
+        :rtype: int or None
+        """
+        for depth in range(1, limit + 1):
+            if self.solvable(answers, depth):
+                return depth
+        return None
+
+    def solvable(self, answers, depth):
+        """
+        Decides whether every answer in a set can surely be solved within *depth*
+        guesses
+
+        :param answers: The candidate answer columns, sorted
+        :type answers: numpy.ndarray
+        :param depth: The number of guesses left
+        :type depth: int
+        :rtype: bool
+        """
+        if len(answers) <= depth:
+            return True
+        return depth > 1 and self.best_guess(answers, depth) is not None
+
+    def best_guess(self, answers, depth):
+        """
+        Finds a guess that surely solves a set of more than *depth* candidates
+        within *depth* guesses
+
+        :param answers: The candidate answer columns, sorted
+        :type answers: numpy.ndarray
+        :param depth: The number of guesses left
+        :type depth: int
+        :return: The guess row, or None if there is no such guess
+        :rtype: int or None
+        """
+        key = hashlib.blake2b(answers.tobytes(), digest_size=16).digest()
+        failed, passed, row = self.table.get(key, (0, None, None))
+        if passed is not None and depth >= passed:
+            return row
+        if depth <= failed:
+            return None
+        self.nodes += 1
+        found = self._search(answers, depth)
+        if found is None:
+            failed = depth
+        else:
+            passed, row = depth, found
+        self._store(key, (failed, passed, row))
+        return found
+
+    def worst_answers(self, answers, depth):
+        """
+        Returns the answers that take all *depth* guesses when a set that is
+        surely solved within *depth* guesses is played with the guesses found
+
+        :param answers: The candidate answer columns, sorted
+        :type answers: numpy.ndarray
+        :param depth: The number of guesses left
+        :type depth: int
+        :rtype: list of ints
+        """
+        if len(answers) <= depth:
+            # The words are guessed in turn, so only a last one takes them all.
+            return [int(i) for i in answers[depth - 1 :]]
+        codes = np.asarray(self.feedback.matrix[self.best_guess(answers, depth), answers])
+        worst = []
+        for code in np.unique(codes):
+            group = answers[codes == code]
+            if code != self.solved_pattern and not self.solvable(group, depth - 2):
+                worst.extend(self.worst_answers(group, depth - 1))
+        return worst
+
+    def _store(self, key, entry):
+        """
+        Records a result, dropping the oldest half of the table when it is full
+        """
+        if key not in self.table and len(self.table) >= self.max_entries:
+            for old in list(self.table)[: len(self.table) // 2]:
+                del self.table[old]
+        self.table[key] = entry
+
+    def _search(self, answers, depth):
+        """
+        Tries every guess on a set of candidates, best first, returning the
+        first row that works
+        """
+        rows = self.rows_for(answers)
+        if rows.size == 0:
+            return None
+        counts = wordmake_strategy.pattern_counts(
+            self.feedback.matrix, rows, answers, self.patterns
+        )
+        # The all-green group is solved by the guess itself.
+        counts[:, self.solved_pattern] = 0
+        largest = counts.max(axis=1)
+        if depth == 2:
+            winners = np.flatnonzero(largest <= 1)
+            return int(rows[winners[0]]) if winners.size else None
+        # No guess splits a subset into more groups than the most any guess
+        # splits the whole set into, so m guesses solve at most spread**(m - 1).
+        spread = int(np.count_nonzero(counts, axis=1).max()) + 1
+        useful = largest < min(len(answers), spread ** (depth - 2) + 1)
+        squares = (counts.astype(np.float64) ** 2).sum(axis=1)
+        order = np.lexsort((squares, largest))
+        for row in rows[order[useful[order]]][: self.width]:
+            codes = np.asarray(self.feedback.matrix[row, answers])
+            sizes = np.bincount(codes, minlength=self.patterns)
+            sizes[self.solved_pattern] = 0
+            if all(
+                self.solvable(answers[codes == code], depth - 1)
+                for code in np.argsort(-sizes, kind="stable")[: np.count_nonzero(sizes)]
+            ):
+                return int(row)
+        return None
+
+
+def _init_worker(guesses, answers, *options):
+    """
+    Builds a MinimaxSolver in a worker process, memory-mapping the cached table
+    """
+    feedback = wordmake_feedback.FeedbackMatrix(guesses, answers)
+    _worker_state["solver"] = MinimaxSolver(feedback, *options)
+
+
+def _group_depth(task):
+    """
+    Finds the guesses one feedback group of the opener needs, and the answers
+    that take them all
+    """
+    code, answers, limit = task
+    solver = _worker_state["solver"]
+    depth = solver.min_depth(answers, limit)
+    if depth is None:
+        return code, None, [int(i) for i in answers]
+    return code, depth, solver.worst_answers(answers, depth)
+
+
+def analyze_opener(  # pylint: disable=too-many-arguments,too-many-locals
+    feedback,
+    opener,
+    *,
+    max_guesses=6,
+    guesses="all",
+    memory_mb=256,
+    width=None,
+    workers=None,
+):
+    """
+    Finds the guess count an opener guarantees for every answer
+
+    :param feedback: The feedback table
+    :type feedback: wordmake_feedback.FeedbackMatrix
+    :param opener: The starting word
+    :type opener: string
+    :param max_guesses: The most guesses to look for, opener included
+    :type max_guesses: int
+    :param guesses: Which later guesses to consider, "all" or only the "candidates"
+    :type guesses: string
+    :param memory_mb: The memory cap of all transposition tables together, in megabytes
+    :type memory_mb: int
+    :param width: How many of the best guesses to try at each step, all if not specified
+    :type width: int
+    :param workers: The number of worker processes, one per core if not specified
+    :type workers: int
+    :return: The guaranteed guess count, or None if it's more than *max_guesses*,
+        and the answers that can take that many guesses, or can't be
+        guaranteed within *max_guesses*
+    :rtype: tuple
+
+    >>> words = ["arose", "cloud", "bound", "found", "hound", "mound", "round", "sound"]
+    >>> table = wordmake_feedback.FeedbackMatrix(words)
+    >>> analyze_opener(table, "arose", workers=1)
+    (5, ['mound'])
+    >>> analyze_opener(table, "cloud", guesses="candidates", max_guesses=6, workers=1)
+    (None, ['bound', 'found', 'hound', 'mound', 'round', 'sound'])
+    """
+    row = feedback.guess_index[opener]
+    codes = np.asarray(feedback.matrix[row])
+    tasks = [
+        (int(code), np.flatnonzero(codes == code), max_guesses - 1)
+        for code in np.unique(codes)
+        if code != 3**feedback.length - 1
+    ]
+    # The largest groups take longest, so they are started first.
+    tasks.sort(key=lambda i: -len(i[1]))
+    workers = min(workers or os.cpu_count() or 1, max(1, len(tasks)))
+    answers = None if feedback.answers is feedback.guesses else feedback.answers
+    if workers == 1:
+        _worker_state["solver"] = MinimaxSolver(feedback, guesses, memory_mb, width)
+        results = list(map(_group_depth, tasks))
+    else:
+        with multiprocessing.Pool(
+            workers,
+            initializer=_init_worker,
+            initargs=(feedback.guesses, answers, guesses, memory_mb // workers, width),
+        ) as pool:
+            results = list(pool.imap_unordered(_group_depth, tasks))
+    # Groups that can't be guaranteed are the worst case, and the bound with them.
+    depths = [max_guesses if depth is None else depth for _, depth, _ in results]
+    bound = 1 + max(depths, default=0)
+    worst = sorted(
+        feedback.answers[i]
+        for (_, _, members), depth in zip(results, depths)
+        if depth + 1 == bound
+        for i in members
+    )
+    return (None if bound > max_guesses else bound), worst
+
+
+def main():
+    """
+    Reports the guaranteed guess count of starting words on the system dictionary
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("openers", nargs="*", default=["clamp"])
+    parser.add_argument("--dictionary", default=DICTIONARY)
+    parser.add_argument("--max-guesses", type=int, default=6)
+    parser.add_argument("--guesses", choices=["all", "candidates"], default="all")
+    parser.add_argument("--memory-mb", type=int, default=256)
+    parser.add_argument(
+        "--width", type=int, default=20, help="guesses to try at each step, 0 for all"
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    wordlist = wordmake_store.load_wordlist(args.dictionary)
+    feedback = wordmake_feedback.FeedbackMatrix(wordlist)
+    for opener in args.openers:
+        bound, worst = analyze_opener(
+            feedback,
+            opener,
+            max_guesses=args.max_guesses,
+            guesses=args.guesses,
+            memory_mb=args.memory_mb,
+            width=args.width or None,
+            workers=args.workers,
+        )
+        if bound is None:
+            print(f"{opener}: not guaranteed within {args.max_guesses} guesses")
+        else:
+            print(f"{opener}: every answer within {bound} guesses")
+        print(f"    worst case: {' '.join(worst)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Wordmake_multi plays several boards at once, as in Quordle or Octordle.
+
+Every guess is played on all boards, and each board has its own hidden word.
+The boards share one wordlist and one feedback table. The candidates of all
+boards are kept together as one array of (answer column, board) pairs, so a
+guess's feedback filters every board with a single gather from the table.
+Guesses are scored against all unsolved boards in one batched pass: the pattern
+of each guess against each pair is offset by the pair's board and counted with
+one bincount, giving the partition of every board at once. Boards with the same
+candidates are scored once, and the pairs are sampled down to the same cell
+budget as a single board, so a guess costs about the same for eight boards as
+for one.
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+import wordmake
+import wordmake_feedback
+import wordmake_strategy
+
+
+class MultiBoard:  # pylint: disable=too-many-instance-attributes
+    """
+    The MultiBoard holds the candidates of every board of one game
+
+    :param wordlist: The list of legal words, shared by all boards
+    :type wordlist: list of strings
+    :param boards: The number of boards
+    :type boards: int
+    :param strategy: The partition strategy whose loss scores each board,
+        wordmake_strategy.ExpectedSizeStrategy if not specified
+    :type strategy: wordmake_strategy.PartitionStrategy
+    :param feedback: The feedback table of the wordlist, loaded if not specified
+    :type feedback: wordmake_feedback.FeedbackMatrix
+
+    >>> game = MultiBoard(["arose", "alamo", "delve", "llama", "cloud"], boards=2)
+    >>> game.play(["delve", "llama"], startingwords="arose")
+    (3, [2, 3])
+    >>> game.history
+    [('arose', [162, 1]), ('delve', [242, 9]), ('llama', [None, 242])]
+    """
+
+    def __init__(self, wordlist, boards=4, strategy=None, feedback=None):
+        self.feedback = feedback or wordmake_feedback.FeedbackMatrix(wordlist)
+        self.boards = boards
+        self.strategy = strategy or wordmake_strategy.ExpectedSizeStrategy()
+        self.patterns = 3**self.feedback.length
+        self.solved_pattern = self.patterns - 1
+        self.columns = None
+        self.owners = None
+        self.solved = None
+        self.history = []
+        self.reset()
+
+    def reset(self):
+        """
+        Starts a new game, with every word a candidate on every board
+        """
+        answers = len(self.feedback.answers)
+        self.columns = np.tile(np.arange(answers, dtype=np.intp), self.boards)
+        self.owners = np.repeat(np.arange(self.boards, dtype=np.intp), answers)
+        self.solved = [None] * self.boards
+        self.history = []
+
+    def candidates(self, board):
+        """
+        Returns the words still possible on a board
+        """
+        return [
+            self.feedback.answers[i] for i in self.columns[self.owners == board]
+        ]
+
+    def unsolved(self):
+        """
+        Returns the boards that are not solved yet
+        """
+        return [board for board, turn in enumerate(self.solved) if turn is None]
+
+    def apply(self, guess, results):
+        """
+        Applies the feedback of one guess to every board
+
+        :param guess: The word guessed
+        :type guess: string
+        :param results: The result on each board, ignored for solved boards
+        :type results: list of ints, strings or lists of strings
+        """
+        codes = np.zeros(self.boards, dtype=np.int64)
+        for board in self.unsolved():
+            codes[board] = wordmake_feedback.as_pattern(results[board])
+        self.apply_patterns(guess, codes)
+
+    def apply_patterns(self, guess, codes):
+        """
+        Applies the pattern codes of one guess on every board at once
+
+        :param guess: The word guessed
+        :type guess: string
+        :param codes: The pattern code on each board, ignored for solved boards
+        :type codes: numpy.ndarray
+        """
+        row = self.feedback.guess_index.get(guess)
+        if row is None:
+            raise ValueError(f"{guess} is not in the wordlist")
+        unsolved = self.unsolved()
+        keep = np.asarray(self.feedback.matrix[row, self.columns]) == codes[self.owners]
+        for board in unsolved:
+            if codes[board] == self.solved_pattern:
+                self.solved[board] = len(self.history) + 1
+                keep &= self.owners != board
+        self.columns = self.columns[keep]
+        self.owners = self.owners[keep]
+        self.history.append(
+            (
+                guess,
+                [
+                    int(codes[board]) if board in unsolved else None
+                    for board in range(self.boards)
+                ],
+            )
+        )
+        remaining = np.bincount(self.owners, minlength=self.boards)
+        if any(remaining[board] == 0 for board in self.unsolved()):
+            raise wordmake.NoWordsLeftException
+
+    def suggest(self):
+        """
+        Picks the next guess by scoring every guess against all unsolved boards
+        in one batched pass
+
+        :return: The word to guess
+        :rtype: string
+        """
+        sizes = np.bincount(self.owners, minlength=self.boards)
+        for board in self.unsolved():
+            # A board down to one word is solved by guessing it.
+            if sizes[board] == 1:
+                return self.feedback.answers[self.columns[self.owners == board][0]]
+        groups = self._distinct_boards()
+        columns, owners = self._sample(groups)
+        if self.strategy.guesses == "candidates":
+            words = [self.feedback.answers[i] for i in np.unique(self.columns)]
+            rows = np.array(
+                sorted({self.feedback.guess_index[i] for i in words}), dtype=np.intp
+            )
+        else:
+            rows = np.arange(len(self.feedback.guesses))
+        losses = self.score(rows, columns, owners, groups)
+        is_candidate = np.zeros(len(self.feedback.guesses), dtype=bool)
+        for i in np.unique(self.columns):
+            row = self.feedback.guess_index.get(self.feedback.answers[i])
+            if row is not None:
+                is_candidate[row] = True
+        # Among equal losses, prefer a guess that could solve a board.
+        best = np.lexsort((~is_candidate[rows], losses))[0]
+        return self.feedback.guesses[rows[best]]
+
+    def _distinct_boards(self):
+        """
+        Groups the unsolved boards by their candidates
+
+        :return: For each distinct candidate set, a board holding it and how many boards do
+        :rtype: list of tuples
+        """
+        seen = {}
+        for board in self.unsolved():
+            key = self.columns[self.owners == board].tobytes()
+            if key in seen:
+                seen[key][1] += 1
+            else:
+                seen[key] = [board, 1]
+        return [tuple(i) for i in seen.values()]
+
+    def _sample(self, groups):
+        """
+        Returns the (column, group) pairs to score, sampling every group by the
+        same fraction when there are more than the strategy's cell budget allows
+        """
+        limit = max(1, self.strategy.max_cells // max(1, len(self.feedback.guesses)))
+        members = [self.columns[self.owners == board] for board, _ in groups]
+        total = sum(len(i) for i in members)
+        fraction = min(1.0, limit / total)
+        columns = []
+        owners = []
+        for group, member in enumerate(members):
+            if fraction < 1.0:
+                size = max(1, round(fraction * len(member)))
+                member = self.strategy.sample(member, size)
+            columns.append(member)
+            owners.append(np.full(len(member), group, dtype=np.intp))
+        return np.concatenate(columns), np.concatenate(owners)
+
+    def score(self, rows, columns, owners, groups, chunk_size=512):
+        """
+        Computes the summed loss of each guess over the boards
+
+        :param rows: The guess indices to score
+        :type rows: numpy.ndarray
+        :param columns: The answer column of each (column, group) pair
+        :type columns: numpy.ndarray
+        :param owners: The group of each pair
+        :type owners: numpy.ndarray
+        :param groups: The (board, count) of each group
+        :type groups: list of tuples
+        :param chunk_size: How many guesses to count at once
+        :type chunk_size: int
+        :return: The loss of each guess
+        :rtype: numpy.ndarray
+        """
+        totals = np.bincount(owners, minlength=len(groups))
+        width = len(groups) * self.patterns
+        losses = np.zeros(len(rows))
+        for start in range(0, len(rows), chunk_size):
+            block = rows[start : start + chunk_size]
+            codes = np.asarray(self.feedback.matrix[np.ix_(block, columns)], dtype=np.int64)
+            codes += owners * self.patterns
+            codes += np.arange(len(block))[:, np.newaxis] * width
+            counts = np.bincount(codes.ravel(), minlength=len(block) * width)
+            counts = counts.reshape((len(block), len(groups), self.patterns))
+            for group, (_, count) in enumerate(groups):
+                losses[start : start + chunk_size] += count * self.strategy.loss(
+                    counts[:, group, :], totals[group]
+                )
+        return losses
+
+    def play(self, answers, startingwords=None, max_guesses=None):
+        """
+        Plays one game against a hidden word on each board
+
+        :param answers: The hidden word of each board
+        :type answers: list of strings
+        :param startingwords: The starting word or words
+        :type startingwords: string, list of strings or None
+        :param max_guesses: Stop after this many guesses, never if not specified
+        :type max_guesses: int
+        :return: The number of guesses taken, and the guess that solved each board
+        :rtype: tuple
+        """
+        self.reset()
+        startingwords = wordmake.normalize_startingwords(startingwords)
+        targets = np.array(
+            [self.feedback.answer_index[i] for i in answers], dtype=np.intp
+        )
+        while self.unsolved() and (
+            max_guesses is None or len(self.history) < max_guesses
+        ):
+            turn = len(self.history)
+            guess = startingwords[turn] if turn < len(startingwords) else self.suggest()
+            row = self.feedback.guess_index[guess]
+            self.apply_patterns(guess, np.asarray(self.feedback.matrix[row, targets]))
+        return len(self.history), list(self.solved)
+
+
+def main():
+    """
+    Plays random multi-board games and reports the guesses and time per guess
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--boards", type=int, default=4)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--dictionary", default="/usr/share/dict/words")
+    parser.add_argument("--startingwords", nargs="*", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    wordler = wordmake.Wordler(verbosity=0)
+    wordler.add_wordlist(filename=args.dictionary)
+    wordlist = wordler.get_wordlist()
+    game = MultiBoard(wordlist, args.boards, feedback=wordler.get_feedback())
+    rng = random.Random(args.seed)
+    guesses = 0
+    start = time.perf_counter()
+    for _ in range(args.games):
+        guesses += game.play(rng.sample(wordlist, args.boards), args.startingwords)[0]
+    elapsed = time.perf_counter() - start
+    print(f"{guesses / args.games:.3f} guesses per game")
+    print(f"{elapsed / guesses * 1000:.3f} ms per guess")
+
+
+if __name__ == "__main__":
+    main()
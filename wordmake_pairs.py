@@ -0,0 +1,270 @@
+"""
+Wordmake_pairs searches for the best pair of starting words.
+
+Two openers are scored by their joint partition of the answers: the entropy of
+the (first pattern, second pattern) groups the answers fall into, which is the
+information the two guesses give together. Scoring every pair exactly is too
+slow, so pairs are pruned with upper bounds from the partitions of the single
+words. The second word can add at most its own entropy, and within each group
+of the first word at most log2 of the smaller of the group's size and the
+second word's group count, so
+
+    H(a, b) <= H(a) + min(H(b), sum over the groups g of a of p(g) log2 min(size(g), groups(b)))
+
+and the same with a and b swapped. Words are visited from the highest entropy
+down, so once H(a) + H(b) falls to the score of the worst pair kept, the rest of
+the row, and eventually the rest of the search, can be skipped.
+
+The best pairs are then played against every answer with Wordler.play_many,
+which makes the same guesses as Wordler.play, and ranked by average guess count.
+"""
+
+import argparse
+import heapq
+
+import numpy as np
+
+import wordmake
+import wordmake_strategy
+
+DICTIONARY = "/usr/share/dict/words"
+# Bounds are compared with this much slack, so rounding never prunes a pair.
+SLACK = 1e-9
+
+
+def group_sizes(matrix, patterns, chunk_size=256):
+    """
+    Returns the sizes of the feedback groups of every guess, sorted ascending
+
+    :param matrix: The guess by answer pattern table
+    :type matrix: numpy.ndarray
+    :param patterns: The number of possible pattern codes
+    :type patterns: int
+    :param chunk_size: How many guesses to count at once
+    :type chunk_size: int
+    :return: One array of group sizes per guess
+    :rtype: list of numpy.ndarray
+
+    >>> table = np.array([[0, 1, 1], [2, 2, 2]], dtype=np.uint8)
+    >>> [i.tolist() for i in group_sizes(table, 3)]
+    [[1, 2], [3]]
+    """
+    answers = np.arange(matrix.shape[1])
+    sizes = []
+    for start in range(0, matrix.shape[0], chunk_size):
+        rows = np.arange(start, min(start + chunk_size, matrix.shape[0]))
+        counts = wordmake_strategy.pattern_counts(matrix, rows, answers, patterns)
+        counts.sort(axis=1)
+        sizes.extend(row[np.searchsorted(row, 1) :] for row in counts)
+    return sizes
+
+
+class Partition:  # pylint: disable=too-few-public-methods
+    """
+    The feedback groups of one guess, with the running sums its bounds need
+
+    >>> part = Partition(np.array([1, 1, 2]))
+    >>> part.groups, part.entropy
+    (3, 1.5)
+    >>> part.bound(np.array([1, 2, 3])).tolist()
+    [0.0, 0.5, 0.5]
+    """
+
+    def __init__(self, sizes):
+        sizes = np.asarray(sizes, dtype=np.float64)
+        total = sizes.sum()
+        self.sizes = sizes
+        self.groups = len(sizes)
+        weighted = sizes * np.log2(np.maximum(sizes, 1.0)) / total
+        self.entropy = float(np.log2(total) - weighted.sum()) if self.groups else 0.0
+        self.weighted = np.concatenate(([0.0], np.cumsum(weighted)))
+        self.mass = np.concatenate(([0.0], np.cumsum(sizes / total)))
+
+    def bound(self, groups):
+        """
+        Bounds the entropy another guess can add to this one
+
+        :param groups: The group counts of the other guesses
+        :type groups: numpy.ndarray
+        :return: sum(p(g) log2 min(size(g), groups)) for each entry of *groups*
+        :rtype: numpy.ndarray
+        """
+        split = np.searchsorted(self.sizes, groups)
+        return self.weighted[split] + (self.mass[-1] - self.mass[split]) * np.log2(
+            np.maximum(groups, 1)
+        )
+
+
+def joint_entropy(matrix, first, seconds, patterns):
+    """
+    Computes the entropy of the joint feedback of one word paired with each of
+    several words
+
+    :param matrix: The guess by answer pattern table
+    :type matrix: numpy.ndarray
+    :param first: The first word's row
+    :type first: int
+    :param seconds: The second words' rows
+    :type seconds: numpy.ndarray
+    :param patterns: The number of possible pattern codes
+    :type patterns: int
+    :return: The entropy of each pair, in bits
+    :rtype: numpy.ndarray
+
+    >>> table = np.array([[0, 0, 1, 1], [0, 1, 0, 1], [0, 0, 1, 1]], dtype=np.uint8)
+    >>> joint_entropy(table, 0, np.array([1, 2]), 3).tolist()
+    [2.0, 1.0]
+    """
+    answers = matrix.shape[1]
+    # Joint codes fit in 16 bits for five letters, where numpy sorts by radix.
+    dtype = np.uint16 if patterns**2 <= 2**16 else np.int64
+    codes = np.asarray(matrix[seconds], dtype=dtype)
+    codes += np.asarray(matrix[first], dtype=dtype) * dtype(patterns)
+    codes.sort(axis=1, kind="stable")
+    # Every row starts a new group, so the rows can be walked as one array.
+    changes = np.ones(codes.shape, dtype=bool)
+    changes[:, 1:] = codes[:, 1:] != codes[:, :-1]
+    starts = np.flatnonzero(changes)
+    counts = np.diff(np.append(starts, codes.size)).astype(np.float64)
+    weighted = np.bincount(
+        starts // answers, weights=counts * np.log2(counts), minlength=len(seconds)
+    )
+    return np.log2(answers) - weighted / answers
+
+
+def pair_search(  # pylint: disable=too-many-locals
+    matrix, patterns, keep=100, block_size=256
+):
+    """
+    Finds the pairs of guesses whose joint feedback has the most entropy
+
+    :param matrix: The guess by answer pattern table
+    :type matrix: numpy.ndarray
+    :param patterns: The number of possible pattern codes
+    :type patterns: int
+    :param keep: How many of the best pairs to return
+    :type keep: int
+    :param block_size: How many second words to score at once
+    :type block_size: int
+    :return: (first row, second row, entropy) tuples, best first,
+        and the number of pairs scored exactly
+    :rtype: tuple
+
+    >>> table = np.array([[0, 0, 1, 1], [0, 1, 0, 1], [0, 0, 1, 1]], dtype=np.uint8)
+    >>> pair_search(table, 3, keep=2)
+    ([(0, 1, 2.0), (1, 2, 2.0)], 3)
+    """
+    parts = [Partition(i) for i in group_sizes(matrix, patterns)]
+    entropy = np.array([i.entropy for i in parts])
+    groups = np.array([i.groups for i in parts])
+    # capped[a, k] bounds what a guess with k groups can add to guess a.
+    capped = np.array([i.bound(np.arange(patterns + 1)) for i in parts])
+    order = np.argsort(-entropy, kind="stable")
+    best = []
+    scored = 0
+
+    def threshold():
+        return best[0][0] - SLACK if len(best) == keep else -np.inf
+
+    for place, first in enumerate(order[:-1]):
+        rest = order[place + 1 :]
+        # Every later pair has both entropies at most these two.
+        if entropy[first] + entropy[rest[0]] <= threshold():
+            break
+        bound = entropy[first] + np.minimum(entropy[rest], capped[first, groups[rest]])
+        bound = np.minimum(
+            bound, entropy[rest] + np.minimum(entropy[first], capped[rest, groups[first]])
+        )
+        for start in range(0, len(rest), block_size):
+            block = rest[start : start + block_size]
+            # H(a) + H(b) falls along the row, since the order is by entropy.
+            if entropy[first] + entropy[block[0]] <= threshold():
+                break
+            block = block[bound[start : start + block_size] > threshold()]
+            if not block.size:
+                continue
+            for second, score in zip(
+                block, joint_entropy(matrix, first, block, patterns)
+            ):
+                # Ties go to the pair found first.
+                scored += 1
+                entry = (float(score), -scored, int(first), int(second))
+                if len(best) < keep:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+    ranked = sorted(best, reverse=True)
+    return [(first, second, score) for score, _, first, second in ranked], scored
+
+
+def rank_pairs(wordlist, pairs, answers=None):
+    """
+    Plays every answer with each pair of starting words
+
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param pairs: The pairs of starting words
+    :type pairs: list of tuples of strings
+    :param answers: The final words to play against, the whole wordlist if not given
+    :type answers: list of strings
+    :return: (first, second, average guesses, failures) tuples, best first
+    :rtype: list of tuples
+
+    >>> rank_pairs(["arose", "alamo", "delve", "llama"], [("arose", "delve")])
+    [('arose', 'delve', 2.25, 0)]
+    """
+    wordler = wordmake.Wordler(verbosity=0)
+    wordler.add_wordlist(wordlist=wordlist)
+    evaluator = wordler.get_feedback().evaluate
+    answers = wordlist if answers is None else answers
+    ranked = []
+    for first, second in pairs:
+        outlist = wordler.play_many(answers, [first, second], evaluator)
+        ranked.append(
+            (
+                first,
+                second,
+                sum(outlist) / len(outlist),
+                len([i for i in outlist if i > 6]),
+            )
+        )
+    ranked.sort(key=lambda i: (i[2], i[3]))
+    return ranked
+
+
+def main():
+    """
+    Searches the system dictionary for the best pairs of starting words
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dictionary", default=DICTIONARY)
+    parser.add_argument("--keep", type=int, default=100)
+    parser.add_argument("--simulate", type=int, default=20)
+    parser.add_argument("--output", default="pairs.txt")
+    args = parser.parse_args()
+    wordler = wordmake.Wordler(verbosity=0)
+    wordler.add_wordlist(filename=args.dictionary)
+    wordlist = wordler.get_wordlist()
+    feedback = wordler.get_feedback()
+    pairs, scored = pair_search(
+        feedback.matrix, 3**feedback.length, max(args.keep, args.simulate)
+    )
+    total = len(wordlist) * (len(wordlist) - 1) // 2
+    print(f"Scored {scored} of {total} pairs exactly")
+    ranked = rank_pairs(
+        wordlist,
+        [(wordlist[first], wordlist[second]) for first, second, _ in pairs[: args.simulate]],
+    )
+    with open(args.output, "w", encoding="utf-8") as fileout:
+        fileout.write("First,Second,Entropy,Avg Guesses,Failures\n")
+        scores = {(wordlist[i], wordlist[j]): score for i, j, score in pairs}
+        for first, second, avgscore, failcount in ranked:
+            fileout.write(
+                f"{first},{second},{scores[first, second]},{avgscore},{failcount}\n"
+            )
+    for first, second, avgscore, failcount in ranked[:10]:
+        print(f"{first} {second}: {avgscore} average, {failcount} failures")
+
+
+if __name__ == "__main__":
+    main()
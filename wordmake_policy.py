@@ -0,0 +1,326 @@
+"""
+Wordmake_policy compiles the solver into a decision tree.
+
+For a fixed wordlist, strategy and starting words the Wordler always makes the
+same guess after the same feedback, so every game is a path through one tree.
+The compiler plays each answer once, merges the paths, and writes the tree as
+flat arrays. A Wordler with the tree loaded plays by lookups alone.
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+import wordmake
+import wordmake_feedback
+import wordmake_strategy
+
+ROOT = 0
+
+
+class PolicyTree:  # pylint: disable=too-many-instance-attributes
+    """
+    The PolicyTree stores the guess of every node and the child reached by every
+    feedback pattern. Edges are sorted by pattern within each node, and an edge
+    whose child is negative ends the game on answer number -1 - child. The tree
+    also records the starting words, the name of the strategy it was compiled
+    with and the hash of the list its guesses were chosen from, which is its
+    answer list unless *guess_key* says otherwise.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        words,
+        startingwords,
+        node_guess,
+        edge_start,
+        edges,
+        *,
+        strategy="frequency",
+        guess_key=None,
+    ):
+        self.words = list(words)
+        self.startingwords = wordmake.normalize_startingwords(startingwords)
+        self.strategy = strategy
+        self.guess_key = guess_key or wordmake_feedback.wordlist_hash(self.words)
+        length = len(self.words[0]) if self.words else 5
+        self.node_guess = np.asarray(node_guess, dtype=np.uint32)
+        self.edge_start = np.asarray(edge_start, dtype=np.uint32)
+        self.edge_pattern = np.asarray(
+            edges[0], dtype=wordmake_feedback.pattern_dtype(length)
+        )
+        self.edge_child = np.asarray(edges[1], dtype=np.int32)
+
+    def matches(self, wordlist, strategy, guesses=None):
+        """
+        Checks whether the tree was compiled for this wordlist and guess list with
+        this strategy. The starting words are checked as each game starts, since
+        they are only known then
+
+        :param wordlist: The possible answers
+        :type wordlist: list of strings
+        :param strategy: The strategy, or its name in wordmake_strategy.STRATEGIES
+        :type strategy: object or string
+        :param guesses: The words that may be guessed, the answers if not given
+        :type guesses: list of strings
+        :rtype: bool
+        """
+        if not isinstance(strategy, str):
+            strategy = wordmake_strategy.strategy_name(strategy)
+        if self.strategy != strategy or self.words != list(wordlist):
+            return False
+        if guesses is None or guesses is wordlist:
+            guesses = self.words
+        return wordmake_feedback.wordlist_hash(guesses) == self.guess_key
+
+    def guess(self, node):
+        """
+        Returns the word guessed at a node
+        """
+        return self.words[self.node_guess[node]]
+
+    def child(self, node, pattern):
+        """
+        Returns the node reached from *node* by the feedback pattern
+
+        :param node: The current node
+        :type node: int
+        :param pattern: The feedback pattern code
+        :type pattern: int
+        :return: The child node, negative if the game is over, None if the pattern is unknown
+        :rtype: int or None
+        """
+        start = self.edge_start[node]
+        end = self.edge_start[node + 1]
+        found = start + np.searchsorted(self.edge_pattern[start:end], pattern)
+        if found < end and self.edge_pattern[found] == pattern:
+            return int(self.edge_child[found])
+        return None
+
+    def guess_counts(self):
+        """
+        Returns the number of guesses each answer takes, by walking the tree
+
+        :return: The guess counts, in wordlist order
+        :rtype: list of ints
+        """
+        counts = [0] * len(self.words)
+        stack = [(ROOT, 1)]
+        while stack:
+            node, depth = stack.pop()
+            for child in self.edge_child[self.edge_start[node] : self.edge_start[node + 1]]:
+                if child < 0:
+                    counts[-1 - child] = depth
+                else:
+                    stack.append((child, depth + 1))
+        return counts
+
+    def save(self, path):
+        """
+        Writes the tree to a binary file
+        """
+        length = len(self.words[0]) if self.words else 0
+        with open(path, "wb") as fileout:
+            np.savez(
+                fileout,
+                words=wordmake_feedback.words_to_array(self.words, length),
+                startingwords=np.array(",".join(self.startingwords)),
+                strategy=np.array(self.strategy),
+                guess_key=np.array(self.guess_key),
+                node_guess=self.node_guess,
+                edge_start=self.edge_start,
+                edge_pattern=self.edge_pattern,
+                edge_child=self.edge_child,
+            )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a tree written by save
+        """
+        with np.load(path) as data:
+            packed = np.asarray(data["words"])
+            raw = packed.tobytes().decode("ascii")
+            width = packed.shape[1] or 1
+            words = [raw[i : i + width] for i in range(0, len(raw), width)]
+            startingwords = str(data["startingwords"])
+            return cls(
+                words,
+                list(startingwords.split(",")) if startingwords else None,
+                data["node_guess"],
+                data["edge_start"],
+                (data["edge_pattern"], data["edge_child"]),
+                # Trees written before the strategy was recorded are all frequency trees.
+                strategy=str(data["strategy"]) if "strategy" in data.files else "frequency",
+                guess_key=str(data["guess_key"]) if "guess_key" in data.files else None,
+            )
+
+
+def compile_policy(wordlist, startingwords=None, strategy="frequency"):
+    """
+    Plays every answer once and merges the games into a PolicyTree
+
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param startingwords: The starting word or words the tree plays with
+    :type startingwords: string, list of strings or None
+    :param strategy: The name of the strategy in wordmake_strategy.STRATEGIES
+    :type strategy: string
+    :return: The compiled tree
+    :rtype: PolicyTree
+
+    >>> tree = compile_policy(["arose", "alamo", "delve", "llama"], "arose")
+    >>> tree.guess(ROOT)
+    'arose'
+    >>> tree.guess_counts()
+    [1, 2, 2, 2]
+    >>> wordler = wordmake.Wordler(verbosity=0, strategy=wordmake_strategy.EntropyStrategy())
+    >>> wordler.add_wordlist(wordlist=["arose", "alamo", "delve", "llama"])
+    >>> wordler.load_policy(tree)
+    Traceback (most recent call last):
+    ...
+    ValueError: The policy was compiled for a different wordlist or strategy
+    >>> wordler = wordmake.Wordler(verbosity=0)
+    >>> wordler.add_wordlist(wordlist=["arose", "alamo", "delve", "llama", "cloud"])
+    >>> wordler.add_answers(wordlist=["arose", "alamo", "delve", "llama"])
+    >>> wordler.load_policy(tree)
+    Traceback (most recent call last):
+    ...
+    ValueError: The policy was compiled for a different wordlist or strategy
+    """
+    feedback = wordmake_feedback.FeedbackMatrix(wordlist)
+    wordler = wordmake.Wordler(
+        verbosity=0, strategy=wordmake_strategy.STRATEGIES[strategy]()
+    )
+    wordler.add_wordlist(wordlist=wordlist)
+    guesses = []
+    children = []
+    path = []
+
+    def recording_evaluator(guess, answer):
+        result = feedback.evaluate(guess, answer)
+        path.append((guess, result))
+        return result
+
+    positions = {word: index for index, word in enumerate(wordlist)}
+    for answer_index, answer in enumerate(wordlist):
+        path.clear()
+        wordler.reset()
+        wordler.play(
+            startingwords=startingwords,
+            evaluator=recording_evaluator,
+            final_word=answer,
+        )
+        _merge_path(path, answer_index, positions, (guesses, children))
+    edge_start, edges = _flatten_edges(children)
+    return PolicyTree(
+        wordlist, startingwords, guesses, edge_start, edges, strategy=strategy
+    )
+
+
+def _merge_path(path, answer_index, positions, tree):
+    """
+    Adds the (guess, pattern) steps of one game to the growing tree
+    """
+    guesses, children = tree
+    node = ROOT
+    for step, (guess, pattern) in enumerate(path):
+        if node == len(guesses):
+            guesses.append(positions[guess])
+            children.append({})
+        elif guesses[node] != positions[guess]:
+            raise ValueError(f"The solver is not deterministic after {path[:step]}")
+        if step == len(path) - 1:
+            children[node][pattern] = -1 - answer_index
+        else:
+            node = children[node].setdefault(pattern, len(guesses))
+
+
+def _flatten_edges(children):
+    """
+    Converts the per-node child dictionaries into sorted flat edge arrays
+    """
+    edge_start = [0]
+    edge_pattern = []
+    edge_child = []
+    for edges in children:
+        for pattern in sorted(edges):
+            edge_pattern.append(pattern)
+            edge_child.append(edges[pattern])
+        edge_start.append(len(edge_pattern))
+    return edge_start, (edge_pattern, edge_child)
+
+
+def policy_path(wordlist, startingwords=None, cache_dir=None, strategy="frequency"):
+    """
+    Returns where the compiled tree for a wordlist, starting words and strategy is cached
+    """
+    key = wordmake_feedback.wordlist_hash(
+        list(wordlist) + ["#"] + list(wordmake.normalize_startingwords(startingwords))
+    )
+    if strategy != "frequency":
+        # Frequency trees keep the paths they were cached under before.
+        key = f"{strategy}-{key}"
+    if cache_dir is None:
+        cache_dir = wordmake_feedback.default_cache_dir()
+    return os.path.join(cache_dir, f"policy-{key}.npz")
+
+
+def cached_policy(  # pylint: disable=too-many-arguments
+    wordlist, startingwords=None, cache_dir=None, build=True, *, strategy="frequency"
+):
+    """
+    Loads the cached tree for a wordlist, starting words and strategy, compiling
+    it if needed
+
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param startingwords: The starting word or words the tree plays with
+    :type startingwords: string, list of strings or None
+    :param cache_dir: The cache directory, the default cache if not specified
+    :type cache_dir: string
+    :param build: Whether to compile the tree when it isn't cached
+    :type build: bool
+    :param strategy: The name of the strategy in wordmake_strategy.STRATEGIES
+    :type strategy: string
+    :return: The tree, or None if it isn't cached and *build* is False
+    :rtype: PolicyTree or None
+    """
+    path = policy_path(wordlist, startingwords, cache_dir, strategy)
+    if os.path.exists(path):
+        return PolicyTree.load(path)
+    if not build:
+        return None
+    tree = compile_policy(wordlist, startingwords, strategy)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        tree.save(temp_path)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+    return tree
+
+
+def main():
+    """
+    Compiles the tree for the system dictionary and writes it to the cache
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("startingwords", nargs="*")
+    parser.add_argument("--dictionary", default="/usr/share/dict/words")
+    parser.add_argument(
+        "--strategy", choices=sorted(wordmake_strategy.STRATEGIES), default="frequency"
+    )
+    args = parser.parse_args()
+    my_wordler = wordmake.Wordler(verbosity=0)
+    my_wordler.add_wordlist(filename=args.dictionary)
+    startingwords = args.startingwords or None
+    tree = cached_policy(my_wordler.get_wordlist(), startingwords, strategy=args.strategy)
+    path = policy_path(tree.words, startingwords, strategy=args.strategy)
+    print(f"{len(tree.node_guess)} nodes in {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Wordmake_results keeps the results of a starting word sweep as they finish.
+
+Each opener's result is appended to a JSON lines file and flushed to disk, so
+the file is also the checkpoint: a restarted sweep skips every opener already
+in it. The first line records a hash of the wordlist, so results of different
+wordlists are never mixed. A store keeps running top-k lists by average score
+and by failure count, and other processes can open the same file to read the
+results so far while the sweep is still appending to it.
+
+The results can be exported as CSV in the format of results.txt.
+"""
+
+import argparse
+import heapq
+import json
+import os
+
+
+class ResultsStore:
+    """
+    The ResultsStore reads and appends the results of one sweep
+
+    :param path: The results file
+    :type path: string
+    :param key: The hash of the swept wordlist, checked against the file's
+    :type key: string
+    :param top: How many of the best openers to track
+    :type top: int
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), "results.jsonl")
+    >>> with ResultsStore(path, key="abc", top=2) as store:
+    ...     store.add("arose", 3.5, 2)
+    ...     store.add("alamo", 3.25, 4)
+    ...     store.add("delve", 4.0, 1)
+    >>> store = ResultsStore(path, key="abc", top=2)
+    >>> "alamo" in store, len(store)
+    (True, 3)
+    >>> store.best_by_score()
+    [('alamo', 3.25, 4), ('arose', 3.5, 2)]
+    >>> store.best_by_failures()
+    [('delve', 4.0, 1), ('arose', 3.5, 2)]
+    """
+
+    def __init__(self, path, key=None, top=10):
+        self.path = path
+        self.key = key
+        self.top = top
+        self.results = {}
+        self.heaps = ([], [])
+        self.offset = 0
+        self.file = None
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reads the results appended to the file since the last read. A partly
+        written last line is left for the next read.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as filein:
+            filein.seek(self.offset)
+            for line in filein:
+                if not line.endswith(b"\n"):
+                    break
+                self.offset += len(line)
+                self._read_record(json.loads(line))
+
+    def _read_record(self, record):
+        """
+        Applies one line of the file
+        """
+        if "key" in record:
+            if self.key is None:
+                self.key = record["key"]
+            elif record["key"] != self.key:
+                raise ValueError(f"{self.path} holds the results of another wordlist")
+            return
+        self._track(record["word"], record["avg"], record["fails"])
+
+    def _track(self, word, avgscore, failcount):
+        """
+        Records a result in memory and in the top-k heaps
+        """
+        if word in self.results:
+            return
+        order = len(self.results)
+        self.results[word] = (avgscore, failcount)
+        # Each heap holds the best openers with the worst on top, so the sort
+        # keys are negated. Earlier openers win ties, as in the original sweep.
+        for heap, rank in zip(self.heaps, ((avgscore, order), (failcount, order))):
+            entry = (-rank[0], -rank[1], word)
+            if len(heap) < self.top:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+
+    def add(self, word, avgscore, failcount):
+        """
+        Appends the result of one opener and flushes it to disk
+
+        :param word: The starting word
+        :type word: string
+        :param avgscore: Its average guess count
+        :type avgscore: float
+        :param failcount: The number of games it took more than six guesses
+        :type failcount: int
+        """
+        if self.file is None:
+            self._open()
+        self.file.write(
+            json.dumps({"word": word, "avg": avgscore, "fails": failcount}) + "\n"
+        )
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.offset = self.file.tell()
+        self._track(word, avgscore, failcount)
+
+    def _open(self):
+        """
+        Opens the file for appending, dropping a partly written last line
+        """
+        self.refresh()
+        self.file = open(  # pylint: disable=consider-using-with
+            self.path, "a+", encoding="utf-8"
+        )
+        self.file.truncate(self.offset)
+        self.file.seek(self.offset)
+        if self.offset == 0 and self.key is not None:
+            self.file.write(json.dumps({"key": self.key}) + "\n")
+
+    def close(self):
+        """
+        Closes the file
+        """
+        fileout, self.file = self.file, None
+        if fileout is not None:
+            fileout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, word):
+        return word in self.results
+
+    def __len__(self):
+        return len(self.results)
+
+    def _best(self, heap):
+        return [
+            (word, *self.results[word])
+            for _, _, word in sorted(heap, key=lambda i: (-i[0], -i[1]))
+        ]
+
+    def best_by_score(self):
+        """
+        Returns the openers with the lowest average guess counts, best first
+
+        :return: (word, avgscore, failcount) tuples
+        :rtype: list of tuples
+        """
+        return self._best(self.heaps[0])
+
+    def best_by_failures(self):
+        """
+        Returns the openers with the fewest failures, best first
+
+        :return: (word, avgscore, failcount) tuples
+        :rtype: list of tuples
+        """
+        return self._best(self.heaps[1])
+
+    def export_csv(self, path, order=None):
+        """
+        Writes the results as CSV in the format of results.txt
+
+        :param path: The CSV file
+        :type path: string
+        :param order: The words in the order to write them, the order they
+            finished in if not specified. Words without a result are skipped.
+        :type order: list of strings
+        """
+        with open(path, "w", encoding="utf-8") as fileout:
+            fileout.write("Words,Avg Guesses,Failures\n")
+            for word in self.results if order is None else order:
+                if word in self.results:
+                    avgscore, failcount = self.results[word]
+                    fileout.write(f"{word},{avgscore},{failcount}\n")
+
+
+def main():
+    """
+    Prints the best openers of a results file, which may still be growing
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("path", nargs="?", default="results.jsonl")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--csv", default=None)
+    args = parser.parse_args()
+    store = ResultsStore(args.path, top=args.top)
+    print(f"{len(store)} openers done")
+    print("Best scores:")
+    for word, avgscore, failcount in store.best_by_score():
+        print(f"    {word} {avgscore} {failcount}")
+    print("Fewest failures:")
+    for word, avgscore, failcount in store.best_by_failures():
+        print(f"    {word} {avgscore} {failcount}")
+    if args.csv:
+        store.export_csv(args.csv)
+
+
+if __name__ == "__main__":
+    main()
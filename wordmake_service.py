@@ -0,0 +1,542 @@
+"""
+Wordmake_service serves many games at once over HTTP/JSON on localhost.
+
+The service holds one wordmake_store.Lexicon, and every game of a word length
+shares that length's wordlist and bitset index read-only. Each length is loaded
+the first time a game of that length starts. A game session is only its
+(guess, pattern) history, its candidate bitset and its pending guess, so
+thousands of sessions fit in little memory. Guesses are computed in a thread
+pool, where each thread keeps one Wordler per length and replays a session into
+it before every guess. Idle sessions expire, and the oldest session is dropped
+when the session limit is reached.
+
+Endpoints:
+
+* ``POST /games`` starts a game, optionally with ``{"length": 6}`` or
+  ``{"startingwords": [...]}``, and returns its id and first guess
+* ``POST /games/<id>/feedback`` takes ``{"feedback": "bgyyb"}``, or the pattern
+  code of the result, for the pending guess and returns the next guess
+* ``GET /games/<id>`` returns the pending guess and the state of the game
+* ``DELETE /games/<id>`` ends a game
+* ``GET /stats`` returns the session count and the p50/p99 latency of each endpoint
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import wordmake
+import wordmake_feedback
+import wordmake_store
+
+LATENCY_WINDOW = 10000
+MAX_BODY = 65536
+
+LOGGER = logging.getLogger(__name__)
+
+
+class ServiceError(Exception):
+    """Exception for a request the service can't answer, with its HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Session:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """
+    The state of one game: its history, candidates and pending guess
+    """
+
+    __slots__ = (
+        "length",
+        "startingwords",
+        "history",
+        "candidates",
+        "guess",
+        "game_over",
+        "busy",
+        "last_used",
+    )
+
+    def __init__(self, length, startingwords):
+        self.length = length
+        self.startingwords = startingwords
+        self.history = ()
+        self.candidates = None
+        self.guess = None
+        self.game_over = False
+        self.busy = False
+        self.last_used = time.monotonic()
+
+    def describe(self, game_id):
+        """
+        Returns the session as a JSON-ready dictionary
+        """
+        return {
+            "game": game_id,
+            "length": self.length,
+            "guess": self.guess,
+            "guess_count": len(self.history) + (self.guess is not None),
+            "game_over": self.game_over,
+            "candidates": bin(self.candidates).count("1"),
+        }
+
+
+class SolverService:  # pylint: disable=too-many-instance-attributes
+    """
+    The SolverService keeps the game sessions and answers requests for them
+
+    >>> service = SolverService(["arose", "alamo", "delve", "llama"], "arose")
+    >>> status, game = asyncio.run(service.dispatch("POST", "/games", b""))
+    >>> status, game["guess"], game["candidates"]
+    (201, 'arose', 4)
+    >>> feedback = f"/games/{game['game']}/feedback"
+    >>> status, game = asyncio.run(service.dispatch("POST", feedback, b'{"feedback": "ybbbb"}'))
+    >>> game["guess"], game["guess_count"], game["candidates"]
+    ('llama', 2, 1)
+    >>> asyncio.run(service.dispatch("POST", feedback, b'{"feedback": "ggggg"}'))[1]["game_over"]
+    True
+    >>> asyncio.run(service.dispatch("GET", "/games/nope", b""))
+    (404, {'error': 'Unknown game nope'})
+    >>> asyncio.run(service.dispatch("POST", "/games", b'{"length": 4}'))
+    (400, {'error': 'There are no words of length 4'})
+    >>> asyncio.run(service.dispatch("POST", "/games", b'{"length": true}'))
+    (400, {'error': 'The length must be a positive integer'})
+    >>> asyncio.run(service.dispatch("POST", "/games", b'{"startingwords": ["delve", 5]}'))
+    (400, {'error': 'The starting words must be a word or a list of words'})
+    >>> asyncio.run(service.dispatch("POST", "/games", b'{"startingwords": "zzzzz"}'))
+    (400, {'error': 'Not words of length 5: zzzzz'})
+    >>> asyncio.run(service.dispatch("POST", "/games", b'{"startingwords": ["delve"]}'))[1]["guess"]
+    'delve'
+    >>> service.lexicon.lengths()
+    [5]
+    """
+
+    def __init__(
+        self, words, startingwords=None, ttl=600.0, max_sessions=10000, workers=None
+    ):
+        if isinstance(words, wordmake_store.Lexicon):
+            self.lexicon = words
+            self.length = 5
+        else:
+            self.lexicon = wordmake_store.Lexicon()
+            self.lexicon.add(words)
+            self.length = len(words[0])
+        self.startingwords = startingwords
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.executor = ThreadPoolExecutor(workers)
+        self.local = threading.local()
+        self.latency = {}
+
+    def get_wordler(self, length):
+        """
+        Returns the calling thread's Wordler for a word length, which shares the
+        lexicon's wordlist and index
+        """
+        if not hasattr(self.local, "wordlers"):
+            self.local.wordlers = {}
+        wordler = self.local.wordlers.get(length)
+        if wordler is None:
+            wordler = wordmake.Wordler(verbosity=0)
+            wordler.use_lexicon(self.lexicon, length)
+            self.local.wordlers[length] = wordler
+        return wordler
+
+    def check_game(self, length, startingwords):
+        """
+        Checks that there are words of a new game's length, before anything of
+        that length is loaded, and that its starting words are words of that
+        length. Runs in the thread pool.
+
+        :param length: The word length
+        :type length: int
+        :param startingwords: The starting word or words, or None
+        :type startingwords: string, list of strings or None
+        """
+        if length not in self.lexicon.available():
+            raise ServiceError(
+                HTTPStatus.BAD_REQUEST, f"There are no words of length {length}"
+            )
+        if startingwords is None:
+            return
+        words = [startingwords] if isinstance(startingwords, str) else startingwords
+        if not isinstance(words, list) or not all(isinstance(i, str) for i in words):
+            raise ServiceError(
+                HTTPStatus.BAD_REQUEST,
+                "The starting words must be a word or a list of words",
+            )
+        positions = self.lexicon.index(length).positions
+        unknown = [i for i in words if i not in positions]
+        if unknown:
+            raise ServiceError(
+                HTTPStatus.BAD_REQUEST,
+                f"Not words of length {length}: {', '.join(unknown)}",
+            )
+
+    def next_guess(self, session, result):
+        """
+        Replays a session into this thread's Wordler, applies the feedback for the
+        pending guess and makes the next guess. Runs in the thread pool.
+
+        :param session: The game session
+        :type session: Session
+        :param result: The pattern code for the pending guess, or None for the first guess
+        :type result: int
+        :return: The new history, candidate bitset and guess
+        :rtype: tuple
+        """
+        wordler = self.get_wordler(session.length)
+        index = wordler.get_index()
+        wordler.reset()
+        for guess, pattern in session.history:
+            wordler.guess_eval(guess, pattern)
+        if session.candidates is None:
+            session.candidates = index.full
+        wordler.game_attrs.set_candidates(index, session.candidates)
+        history = session.history
+        if result is not None:
+            wordler.guess_eval(session.guess, result)
+            wordler.gen_new_list()
+            history += ((session.guess, result),)
+        wordler.game_attrs["guess_count"] = len(history)
+        wordler.refresh_counter()
+        guess = wordler.make_guess(session.startingwords)
+        return history, wordler.game_attrs.candidates, guess
+
+    async def dispatch(self, method, path, body):
+        """
+        Answers one request
+
+        :param method: The HTTP method
+        :type method: string
+        :param path: The request path
+        :type path: string
+        :param body: The request body, JSON or empty
+        :type body: bytes
+        :return: The HTTP status and the JSON-ready response
+        :rtype: tuple
+        """
+        route = self.route(method, path)
+        start = time.perf_counter()
+        try:
+            payload = json.loads(body) if body.strip() else {}
+            if not isinstance(payload, dict):
+                raise ServiceError(HTTPStatus.BAD_REQUEST, "The body must be an object")
+            status, response = await getattr(self, route)(path, payload)
+        except ServiceError as error:
+            status, response = error.status, {"error": str(error)}
+        except json.JSONDecodeError as error:
+            status, response = HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception("Failed to answer %s %s", method, path)
+            status = HTTPStatus.INTERNAL_SERVER_ERROR
+            response = {"error": "Internal server error"}
+        self.latency.setdefault(route, deque(maxlen=LATENCY_WINDOW)).append(
+            time.perf_counter() - start
+        )
+        return int(status), response
+
+    @staticmethod
+    def route(method, path):
+        """
+        Returns the name of the method that handles a request
+
+        >>> SolverService.route("POST", "/games/abc/feedback")
+        'submit_feedback'
+        >>> SolverService.route("PUT", "/games")
+        'not_found'
+        """
+        parts = path.strip("/").split("/")
+        routes = {
+            ("POST", 1): "start_game",
+            ("GET", 2): "get_game",
+            ("DELETE", 2): "end_game",
+            ("POST", 3): "submit_feedback",
+        }
+        if parts == ["stats"] and method == "GET":
+            return "get_stats"
+        if parts[0] != "games" or (len(parts) == 3 and parts[2] != "feedback"):
+            return "not_found"
+        return routes.get((method, len(parts)), "not_found")
+
+    def get_session(self, path):
+        """
+        Returns the id and session named in a path, marking the session used
+        """
+        game_id = path.strip("/").split("/")[1]
+        session = self.sessions.get(game_id)
+        if session is None:
+            raise ServiceError(HTTPStatus.NOT_FOUND, f"Unknown game {game_id}")
+        session.last_used = time.monotonic()
+        self.sessions.move_to_end(game_id)
+        return game_id, session
+
+    async def advance(self, session, result):
+        """
+        Makes a session's next guess in the thread pool
+        """
+        if session.busy:
+            raise ServiceError(HTTPStatus.CONFLICT, "A guess is already being made")
+        session.busy = True
+        try:
+            loop = asyncio.get_running_loop()
+            session.history, session.candidates, session.guess = (
+                await loop.run_in_executor(
+                    self.executor, self.next_guess, session, result
+                )
+            )
+        except wordmake.NoWordsLeftException as error:
+            raise ServiceError(HTTPStatus.CONFLICT, "There are no words left") from error
+        finally:
+            session.busy = False
+
+    async def start_game(self, _, payload):
+        """
+        Starts a game and makes its first guess
+        """
+        length = payload.get("length", self.length)
+        if not isinstance(length, int) or isinstance(length, bool) or length < 1:
+            raise ServiceError(HTTPStatus.BAD_REQUEST, "The length must be a positive integer")
+        startingwords = payload.get("startingwords")
+        await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.check_game, length, startingwords
+        )
+        if startingwords is None and length == self.length:
+            startingwords = self.startingwords
+        while len(self.sessions) >= self.max_sessions:
+            self.sessions.popitem(last=False)
+        session = Session(length, startingwords)
+        await self.advance(session, None)
+        game_id = secrets.token_hex(8)
+        self.sessions[game_id] = session
+        return HTTPStatus.CREATED, session.describe(game_id)
+
+    async def submit_feedback(self, path, payload):
+        """
+        Applies the feedback for the pending guess and makes the next guess
+        """
+        game_id, session = self.get_session(path)
+        result = payload.get("feedback")
+        if isinstance(result, list):
+            result = "".join(result)
+        if isinstance(result, int) and not isinstance(result, bool):
+            # A pattern code is taken as it is.
+            valid = 0 <= result < 3**session.length
+        else:
+            valid = (
+                isinstance(result, str)
+                and len(result) == session.length
+                and not set(result) - set("gyb")
+            )
+        if not valid:
+            raise ServiceError(
+                HTTPStatus.BAD_REQUEST,
+                f"The feedback must be {session.length} of 'g', 'y' and 'b'"
+                " or a pattern code",
+            )
+        if session.game_over:
+            raise ServiceError(HTTPStatus.CONFLICT, "The game is over")
+        result = wordmake_feedback.as_pattern(result)
+        if result == 3**session.length - 1:
+            session.history += ((session.guess, result),)
+            session.guess = None
+            session.game_over = True
+        else:
+            await self.advance(session, result)
+        return HTTPStatus.OK, session.describe(game_id)
+
+    async def get_game(self, path, _):
+        """
+        Returns the pending guess and the state of a game
+        """
+        game_id, session = self.get_session(path)
+        return HTTPStatus.OK, session.describe(game_id)
+
+    async def end_game(self, path, _):
+        """
+        Ends a game
+        """
+        game_id, _ = self.get_session(path)
+        del self.sessions[game_id]
+        return HTTPStatus.OK, {"game": game_id}
+
+    async def get_stats(self, *_):
+        """
+        Returns the session count and the latency of each endpoint
+        """
+        return HTTPStatus.OK, self.stats()
+
+    async def not_found(self, path, _):
+        """
+        Answers a request for an unknown endpoint
+        """
+        raise ServiceError(HTTPStatus.NOT_FOUND, f"No endpoint {path}")
+
+    def stats(self):
+        """
+        Returns the session count and the p50/p99 latency of each endpoint in
+        milliseconds, over its most recent requests
+        """
+        return {
+            "sessions": len(self.sessions),
+            "latency": {
+                route: {
+                    "count": len(times),
+                    "p50": percentile(times, 0.5) * 1000,
+                    "p99": percentile(times, 0.99) * 1000,
+                }
+                for route, times in self.latency.items()
+            },
+        }
+
+    def expire(self, now=None):
+        """
+        Drops the sessions that have been idle for longer than the ttl
+
+        :return: The number of sessions dropped
+        :rtype: int
+        """
+        now = time.monotonic() if now is None else now
+        expired = 0
+        while self.sessions:
+            game_id, session = next(iter(self.sessions.items()))
+            if now - session.last_used <= self.ttl or session.busy:
+                break
+            del self.sessions[game_id]
+            expired += 1
+        return expired
+
+    async def expire_sessions(self):
+        """
+        Drops idle sessions periodically
+        """
+        while True:
+            await asyncio.sleep(min(self.ttl / 4, 60))
+            self.expire()
+
+    async def handle(self, reader, writer):
+        """
+        Answers the requests of one HTTP/1.1 connection
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, path = request_line.decode("latin-1").split()[:2]
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await respond(writer, 400, {"error": "Malformed request"})
+                    break
+                if length > MAX_BODY:
+                    await respond(writer, 413, {"error": "The body is too large"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, response = await self.dispatch(method, path, body)
+                await respond(writer, status, response)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """
+        Serves requests until cancelled
+        """
+        server = await asyncio.start_server(self.handle, host, port)
+        reaper = asyncio.create_task(self.expire_sessions())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reaper.cancel()
+            self.executor.shutdown(wait=False)
+
+
+async def respond(writer, status, response):
+    """
+    Writes one JSON response
+    """
+    data = json.dumps(response).encode()
+    writer.write(
+        (
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n"
+        ).encode()
+        + data
+    )
+    await writer.drain()
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which the given fraction of the values fall
+
+    :param values: The values
+    :type values: iterable of floats
+    :param fraction: The fraction, between 0 and 1
+    :type fraction: float
+    :return: The percentile, or 0.0 if there are no values
+    :rtype: float
+
+    >>> percentile(range(1, 101), 0.5), percentile(range(1, 101), 0.99)
+    (50, 99)
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))]
+
+
+def main():
+    """
+    Serves the solver for the system dictionary on localhost
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--dictionary", default="/usr/share/dict/words")
+    parser.add_argument("--startingwords", nargs="*", default=None)
+    parser.add_argument("--ttl", type=float, default=600.0)
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    service = SolverService(
+        wordmake_store.Lexicon(args.dictionary),
+        args.startingwords or None,
+        args.ttl,
+        args.max_sessions,
+        args.workers,
+    )
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
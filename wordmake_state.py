@@ -0,0 +1,152 @@
+"""
+Wordmake_state holds compact, immutable snapshots of a Wordler's game.
+
+A GameState is a named tuple that keeps the candidates as a bitset over the
+wordlist's WordIndex and the greens, yellows and blacks as tuples of
+(letter, position mask) pairs. Python ints and tuples are immutable, so a
+snapshot shares them with the Wordler instead of copying them, and taking or
+restoring one costs only the handful of letters guessed so far.
+GameState.branch plays a guess on a copy, which makes lookahead, undo and
+what-if simulation cheap.
+"""
+
+from collections import namedtuple
+
+import wordmake_feedback
+
+CheckedLetters = namedtuple("CheckedLetters", ["greens", "yellows", "blacks"])
+
+
+def pack_letters(checked_letters):
+    """
+    Packs the greens, yellows and blacks dictionaries into tuples of
+    (letter, position mask) pairs
+
+    :param checked_letters: The greens, yellows and blacks dictionaries
+    :type checked_letters: namedtuple
+    :return: The packed greens, yellows and blacks
+    :rtype: tuple of tuples
+
+    >>> pack_letters(CheckedLetters({"e": {4: None}}, {"a": {0: None, 2: None}}, {}))
+    ((('e', 16),), (('a', 5),), ())
+    """
+    return tuple(
+        tuple((letter, sum(1 << num for num in pos)) for letter, pos in group.items())
+        for group in checked_letters
+    )
+
+
+def unpack_letters(letters):
+    """
+    Rebuilds the greens, yellows and blacks dictionaries from their packed form
+
+    :param letters: The packed greens, yellows and blacks
+    :type letters: tuple of tuples
+    :return: The greens, yellows and blacks dictionaries
+    :rtype: CheckedLetters
+
+    >>> unpack_letters(((("e", 16),), (("a", 5),), ()))
+    CheckedLetters(greens={'e': {4: None}}, yellows={'a': {0: None, 2: None}}, blacks={})
+    """
+    return CheckedLetters(
+        *(
+            {
+                letter: dict.fromkeys(
+                    num for num in range(mask.bit_length()) if mask >> num & 1
+                )
+                for letter, mask in group
+            }
+            for group in letters
+        )
+    )
+
+
+class GameState(
+    namedtuple(
+        "GameState",
+        [
+            "word_index",
+            "candidates",
+            "letters",
+            "guess_count",
+            "game_over",
+            "final_word",
+            "guess_word",
+            "policy_node",
+        ],
+        defaults=(((), (), ()), 0, False, None, "", None),
+    )
+):
+    """
+    One position of a game: the candidates, the letters checked so far and
+    the turn counters. States are immutable, so they can be shared freely.
+
+    :param word_index: The index of the wordlist the candidates are a bitset over
+    :type word_index: wordmake_index.WordIndex
+    :param candidates: The candidate bitset
+    :type candidates: int
+
+    >>> import wordmake_index
+    >>> start = GameState.start(wordmake_index.WordIndex(["arose", "alamo", "delve", "llama"]))
+    >>> child = start.branch("arose", "ybbbb")
+    >>> child.words(), child.guess_count, start.size()
+    (['llama'], 1, 4)
+    >>> child.branch("llama", "ggggg").game_over
+    True
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def start(cls, word_index):
+        """
+        Returns the state before the first guess, with every word a candidate
+        """
+        return cls(word_index, word_index.full)
+
+    def size(self):
+        """
+        Returns the number of candidates
+        """
+        return bin(self.candidates).count("1")
+
+    def words(self):
+        """
+        Returns the candidate words, in wordlist order
+        """
+        return self.word_index.materialize(self.candidates)
+
+    def checked_letters(self):
+        """
+        Returns fresh greens, yellows and blacks dictionaries, as a Wordler keeps them
+        """
+        return unpack_letters(self.letters)
+
+    def branch(self, guess, feedback):
+        """
+        Plays one guess, leaving this state as it is
+
+        :param guess: The word guessed
+        :type guess: string
+        :param feedback: The result of the guess, or its pattern code
+        :type feedback: string, list of strings or int
+        :return: The state after the guess
+        :rtype: GameState
+        """
+        code = wordmake_feedback.as_pattern(feedback)
+        positions = wordmake_feedback.pattern_positions(code, len(guess))
+        groups = [dict(group) for group in self.letters]
+        for group, nums in zip(groups, positions):
+            for num in nums:
+                group[guess[num]] = group.get(guess[num], 0) | 1 << num
+        letters = tuple(tuple(group.items()) for group in groups)
+        greens = sum(bin(mask).count("1") for _, mask in letters[0])
+        return GameState(
+            self.word_index,
+            self.word_index.filter(self.candidates, unpack_letters(letters)),
+            letters,
+            self.guess_count + 1,
+            greens == len(guess),
+            self.final_word,
+            guess,
+        )
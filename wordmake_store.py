@@ -0,0 +1,461 @@
+"""
+Wordmake_store keeps compiled copies of dictionary files and compact word stores.
+
+Filtering the system dictionary down to the words of one length means reading
+and checking every line of it. One pass sorts the words of every length, and each
+length is saved as a fixed-width byte array, keyed by the dictionary's path, size
+and modification time and the word length, so every later load of any length is
+a memory-map of its array.
+
+A WordStore keeps a wordlist as one N by length byte array, optionally in shared
+memory so worker processes can attach to it without copying, and hands out
+WordViews that behave like lists of words.
+
+A Lexicon serves every word length of one dictionary, building each length's
+wordlist, bitset index and feedback table on first use and sharing them after.
+"""
+
+import hashlib
+import os
+import threading
+from collections.abc import Sequence
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import wordmake_feedback
+import wordmake_index
+
+_loaded = {}
+
+
+def read_dictionary(filename, length=5):
+    """
+    Reads the legal words of one length from a plain text dictionary
+
+    :param filename: The dictionary file, one word per line
+    :type filename: string
+    :param length: The word length to keep
+    :type length: int
+    :return: The lowercase ASCII words of that length, without duplicates
+    :rtype: list of strings
+    """
+    return read_dictionary_lengths(filename).get(length, [])
+
+
+def read_dictionary_lengths(filename):
+    """
+    Reads the legal words of every length from a plain text dictionary, in one pass
+
+    :param filename: The dictionary file, one word per line
+    :type filename: string
+    :return: The lowercase ASCII words of each length, without duplicates
+    :rtype: dict of lists of strings
+    """
+    words = {}
+    with open(filename, encoding="utf-8") as dictionary:
+        for i in dictionary:
+            word = i.strip()
+            if word.isalpha() and i.isascii() and i.islower():
+                words.setdefault(len(word), {})[word.lower()] = None
+    return {length: list(i) for length, i in words.items()}
+
+
+def compiled_path(filename, length=5, cache_dir=None):
+    """
+    Returns where the compiled wordlist of a dictionary is cached
+
+    :param filename: The dictionary file
+    :type filename: string
+    :param length: The word length, or None for the list of lengths the
+        dictionary has words of
+    :type length: int
+    :param cache_dir: The cache directory, the default cache if not specified
+    :type cache_dir: string
+    :return: The path of the compiled wordlist
+    :rtype: string
+    """
+    stat = os.stat(filename)
+    key = hashlib.sha1(
+        f"{os.path.abspath(filename)}|{stat.st_size}|{stat.st_mtime_ns}|{length}".encode()
+    ).hexdigest()
+    if cache_dir is None:
+        cache_dir = wordmake_feedback.default_cache_dir()
+    kind = "words" if length is not None else "lengths"
+    return os.path.join(cache_dir, f"{kind}-{key}.npy")
+
+
+def unpack_words(packed):
+    """
+    Converts a fixed-width byte array back into a list of words
+
+    :param packed: The N by length array of letter bytes
+    :type packed: numpy.ndarray
+    :return: The words
+    :rtype: list of strings
+
+    >>> unpack_words(wordmake_feedback.words_to_array(["arose", "delve"]))
+    ['arose', 'delve']
+    """
+    width = packed.shape[1]
+    raw = packed.tobytes().decode("ascii")
+    return [raw[i : i + width] for i in range(0, len(raw), width or 1)]
+
+
+def compile_dictionary(filename, lengths=(), cache_dir=None):
+    """
+    Compiles every word length of a dictionary in one pass and saves each,
+    along with the list of lengths the dictionary has words of
+
+    :param filename: The dictionary file
+    :type filename: string
+    :param lengths: Lengths to compile even if the dictionary has no words of them
+    :type lengths: iterable of ints
+    :param cache_dir: The cache directory, the default cache if not specified
+    :type cache_dir: string
+    :return: The N by length array of letter bytes of each length
+    :rtype: dict of numpy.ndarray
+    """
+    words = read_dictionary_lengths(filename)
+    compiled = {}
+    for length in set(words) | set(lengths):
+        packed = wordmake_feedback.words_to_array(words.get(length, []), length)
+        compiled[length] = packed
+        save_array(compiled_path(filename, length, cache_dir), packed)
+    save_array(
+        compiled_path(filename, None, cache_dir), np.array(sorted(words), dtype=np.int64)
+    )
+    return compiled
+
+
+def save_array(path, array):
+    """
+    Saves an array to the cache atomically, doing nothing if the cache can't be written
+
+    :param path: The file to save to
+    :type path: string
+    :param array: The array
+    :type array: numpy.ndarray
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as fileout:
+            np.save(fileout, array)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+
+def load_lengths(filename, cache_dir=None):
+    """
+    Returns the word lengths a dictionary has words of, from the compiled cache,
+    compiling the dictionary first if the cache is missing or older than it
+
+    :param filename: The dictionary file
+    :type filename: string
+    :param cache_dir: The cache directory, the default cache if not specified
+    :type cache_dir: string
+    :return: The word lengths, ascending
+    :rtype: list of ints
+    """
+    path = compiled_path(filename, None, cache_dir)
+    if os.path.exists(path):
+        try:
+            return np.load(path).tolist()
+        except ValueError:
+            pass
+    compiled = compile_dictionary(filename, cache_dir=cache_dir)
+    return sorted(length for length, packed in compiled.items() if len(packed))
+
+
+def load_packed(filename, length=5, cache_dir=None):
+    """
+    Memory-maps the compiled wordlist of a dictionary, compiling every length
+    of it if this one is missing or older than the dictionary
+
+    :param filename: The dictionary file
+    :type filename: string
+    :param length: The word length
+    :type length: int
+    :param cache_dir: The cache directory, the default cache if not specified
+    :type cache_dir: string
+    :return: The N by length array of letter bytes
+    :rtype: numpy.ndarray
+    """
+    path = compiled_path(filename, length, cache_dir)
+    if os.path.exists(path):
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            pass
+    packed = compile_dictionary(filename, [length], cache_dir)[length]
+    if not os.path.exists(path):
+        return packed
+    return np.load(path, mmap_mode="r")
+
+
+def load_wordlist(filename, length=5, cache_dir=None):
+    """
+    Returns the legal words of one length from a dictionary, through the
+    compiled cache. Repeated loads in one process return the same list.
+
+    :param filename: The dictionary file
+    :type filename: string
+    :param length: The word length
+    :type length: int
+    :param cache_dir: The cache directory, the default cache if not specified
+    :type cache_dir: string
+    :return: The words
+    :rtype: list of strings
+    """
+    path = compiled_path(filename, length, cache_dir)
+    if path not in _loaded:
+        _loaded[path] = unpack_words(load_packed(filename, length, cache_dir))
+    return _loaded[path]
+
+
+class WordStore:
+    """
+    The WordStore holds a wordlist as one contiguous N by length array of letter
+    bytes. Its words member is a WordView over the whole array.
+
+    >>> store = WordStore.from_words(["arose", "alamo", "delve"])
+    >>> store.words[1], len(store.words), "delve" in store.words
+    ('alamo', 3, True)
+    >>> store.words.take([2, 0]) == ["delve", "arose"]
+    True
+    """
+
+    def __init__(self, packed, shm=None):
+        self.packed = packed
+        self.shm = shm
+        self.positions = None
+        self.words = WordView(self)
+
+    @classmethod
+    def from_words(cls, words, length=None, shared=False):
+        """
+        Packs a list of words into a store, in shared memory if *shared*
+        """
+        packed = wordmake_feedback.words_to_array(list(words), length)
+        if not shared:
+            return cls(np.array(packed))
+        shm = shared_memory.SharedMemory(create=True, size=max(1, packed.nbytes))
+        shared_packed = np.ndarray(packed.shape, dtype=np.uint8, buffer=shm.buf)
+        shared_packed[:] = packed
+        return cls(shared_packed, shm)
+
+    @classmethod
+    def from_dictionary(cls, filename, length=5, cache_dir=None):
+        """
+        Memory-maps the compiled wordlist of a dictionary as a store
+        """
+        return cls(load_packed(filename, length, cache_dir))
+
+    def share(self):
+        """
+        Returns a picklable handle that WordStore.attach turns back into this store
+        without copying the words. The store must have been created with shared=True.
+        """
+        return self.shm.name, self.packed.shape
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Attaches to a store shared by another process
+        """
+        name, shape = handle
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(np.ndarray(shape, dtype=np.uint8, buffer=shm.buf), shm)
+
+    def close(self, unlink=False):
+        """
+        Detaches from the shared memory, freeing it too if *unlink*
+        """
+        if self.shm is not None:
+            self.packed = self.packed.copy()
+            self.positions = None
+            self.words = WordView(self)
+            self.shm.close()
+            if unlink:
+                self.shm.unlink()
+            self.shm = None
+
+    def position(self, word):
+        """
+        Returns the row of a word, or None if the store doesn't hold it
+        """
+        if self.positions is None:
+            self.positions = wordmake_feedback.PackedIndex(self.packed)
+        return self.positions.get(word)
+
+
+class WordView(Sequence):
+    """
+    A read-only list of words backed by a WordStore, either the whole store or
+    the rows in an index array. Candidate sets are WordViews over index arrays.
+    """
+
+    def __init__(self, store, indices=None):
+        self.store = store
+        self.indices = None if indices is None else np.asarray(indices, dtype=np.intp)
+
+    @property
+    def packed(self):
+        """
+        The letter bytes of the words in the view
+        """
+        if self.indices is None:
+            return self.store.packed
+        return self.store.packed[self.indices]
+
+    def take(self, indices):
+        """
+        Returns the view of the given positions of this view
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        if self.indices is not None:
+            indices = self.indices[indices]
+        return WordView(self.store, indices)
+
+    def __len__(self):
+        if self.indices is None:
+            return self.store.packed.shape[0]
+        return len(self.indices)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.take(np.arange(len(self))[item])
+        row = item if self.indices is None else self.indices[item]
+        return self.store.packed[row].tobytes().decode("ascii")
+
+    def __iter__(self):
+        return iter(unpack_words(self.packed))
+
+    def __contains__(self, word):
+        row = self.store.position(word)
+        if row is None:
+            return False
+        return self.indices is None or bool((self.indices == row).any())
+
+    def __eq__(self, other):
+        if isinstance(other, WordView):
+            return np.array_equal(self.packed, other.packed)
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+    def __repr__(self):
+        return f"WordView({list(self)!r})"
+
+
+class Lexicon:
+    """
+    The Lexicon holds every word length of one dictionary. Each length's wordlist,
+    bitset index and feedback table is built the first time it is asked for and
+    then shared by everything that asks again, from any thread. The first
+    wordlist of any length compiles the whole dictionary in one pass.
+
+    Wordlists that don't come from a file can be added with add.
+
+    >>> lexicon = Lexicon()
+    >>> lexicon.add(["arose", "delve"])
+    >>> lexicon.add(["cat", "dog"])
+    >>> lexicon.lengths()
+    [3, 5]
+    >>> lexicon.index(3).materialize(lexicon.index(3).contains("g"))
+    ['dog']
+    >>> lexicon.index(3) is lexicon.index(3)
+    True
+    """
+
+    def __init__(self, filename=None, cache_dir=None):
+        self.filename = filename
+        self.cache_dir = cache_dir
+        self.built = {}
+        self.lock = threading.RLock()
+
+    def _get(self, kind, length, build):
+        """
+        Returns a built object, building it first if needed
+        """
+        with self.lock:
+            if (kind, length) not in self.built:
+                self.built[kind, length] = build()
+            return self.built[kind, length]
+
+    def add(self, wordlist):
+        """
+        Serves a wordlist for the length of its words
+        """
+        length = len(wordlist[0])
+        with self.lock:
+            for kind in ("words", "index", "feedback"):
+                self.built.pop((kind, length), None)
+            self.built["words", length] = wordlist
+
+    def lengths(self):
+        """
+        Returns the word lengths whose wordlists have been loaded or added
+        """
+        with self.lock:
+            return sorted(
+                length
+                for kind, length in self.built
+                if kind == "words" and len(self.built[kind, length])
+            )
+
+    def available(self):
+        """
+        Returns the word lengths that have words, in the dictionary or added,
+        without loading or compiling any of them
+
+        >>> lexicon = Lexicon()
+        >>> lexicon.add(["arose", "delve"])
+        >>> lexicon.available()
+        [5]
+        """
+        if self.filename is None:
+            return self.lengths()
+        found = self._get(
+            "lengths", None, lambda: set(load_lengths(self.filename, self.cache_dir))
+        )
+        return sorted(found | set(self.lengths()))
+
+    def wordlist(self, length=5):
+        """
+        Returns the words of one length, an empty list if there are none
+        """
+        if self.filename is None:
+            return self._get("words", length, list)
+        return self._get(
+            "words",
+            length,
+            lambda: load_wordlist(self.filename, length, self.cache_dir),
+        )
+
+    def index(self, length=5):
+        """
+        Returns the bitset index of the words of one length
+        """
+        return self._get(
+            "index", length, lambda: wordmake_index.WordIndex(self.wordlist(length))
+        )
+
+    def feedback(self, length=5):
+        """
+        Returns the feedback table of the words of one length
+        """
+        return self._get(
+            "feedback",
+            length,
+            lambda: wordmake_feedback.FeedbackMatrix(
+                self.wordlist(length), cache_dir=self.cache_dir
+            ),
+        )
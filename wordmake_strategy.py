@@ -0,0 +1,461 @@
+"""
+Wordmake_strategy holds the guess scoring strategies a Wordler can use.
+
+A strategy is any object with a suggest(wordler) method returning the next
+guess. The letter frequency heuristic is the default; the partition strategies
+score every guess by how it would split the remaining candidates into feedback
+patterns, using the precomputed feedback table. The lookahead strategy goes one
+or two plies further, costing each guess by the guesses its feedback groups
+are expected to need in turn.
+"""
+
+import hashlib
+import math
+from abc import ABC
+from abc import abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+
+import wordmake_index
+
+# The guesses a set of candidates needs past the last ply of the lookahead grow
+# with the log of its size. Fitted to how many guesses EntropyStrategy takes from
+# sets of each size on the system dictionary.
+LEAF_BASE = 1.06
+LEAF_GROWTH = 0.17
+
+
+class FrequencyStrategy:  # pylint: disable=too-few-public-methods
+    """
+    The original letter frequency heuristic, Wordler.wordsuggest, starting from
+    the top *depth* letters, or as many as the word length if not specified
+    """
+
+    def __init__(self, depth=None):
+        self.depth = depth
+
+    def suggest(self, wordler):
+        """
+        Returns the next guess for the Wordler's current game
+        """
+        return wordler.wordsuggest(self.depth or wordler.length)
+
+
+class PartitionStrategy(ABC):
+    """
+    The base of the strategies that score guesses by the partition of the
+    candidates into feedback patterns. Subclasses define loss, where lower is better.
+
+    When guesses times candidates is larger than *max_cells*, the candidates are
+    replaced by a random sample so that each turn costs about the same. The
+    sample is drawn from the candidates and *seed* alone, so the guess for a
+    set of candidates doesn't depend on the turns played before it.
+
+    >>> PartitionStrategy()  # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    TypeError: Can't instantiate abstract class PartitionStrategy...
+    """
+
+    def __init__(self, guesses="all", max_cells=2_000_000, seed=0):
+        self.guesses = guesses
+        self.max_cells = max_cells
+        self.seed = seed
+
+    @abstractmethod
+    def loss(self, counts, total):
+        """
+        Scores each guess from its pattern counts
+
+        :param counts: A guesses by patterns array of how many candidates give each pattern
+        :type counts: numpy.ndarray
+        :param total: The number of candidates partitioned
+        :type total: int
+        :return: The loss of each guess
+        :rtype: numpy.ndarray
+        """
+
+    def suggest(self, wordler):
+        """
+        Returns the next guess for the Wordler's current game
+        """
+        feedback = wordler.get_feedback()
+        answers = candidate_columns(wordler, feedback)
+        if answers is None:
+            return wordler.wordsuggest(wordler.length)
+        if len(answers) <= 2:
+            return feedback.answers[answers[0]]
+        if self.guesses == "candidates":
+            rows = np.array(
+                [feedback.guess_index[feedback.answers[i]] for i in answers],
+                dtype=np.intp,
+            )
+        else:
+            rows = np.arange(len(feedback.guesses))
+        losses = self.score(feedback, rows, answers)
+        is_candidate = np.zeros(len(feedback.guesses), dtype=bool)
+        for i in answers:
+            row = feedback.guess_index.get(feedback.answers[i])
+            if row is not None:
+                is_candidate[row] = True
+        # Among equal losses, prefer a guess that could be the answer itself.
+        best = np.lexsort((~is_candidate[rows], losses))[0]
+        return feedback.guesses[rows[best]]
+
+    def score(self, feedback, rows, answers):
+        """
+        Computes the loss of each guess row against the candidate columns
+
+        :param feedback: The feedback table
+        :type feedback: wordmake_feedback.FeedbackMatrix
+        :param rows: The guess indices to score
+        :type rows: numpy.ndarray
+        :param answers: The candidate answer indices
+        :type answers: numpy.ndarray
+        :return: The loss of each guess
+        :rtype: numpy.ndarray
+        """
+        limit = max(1, self.max_cells // max(1, len(rows)))
+        if len(answers) > limit:
+            answers = self.sample(answers, limit)
+        counts = answer_pattern_counts(
+            feedback.answer_major(), rows, answers, 3**feedback.length
+        )
+        return self.loss(counts, len(answers))
+
+    def sample(self, answers, size):
+        """
+        Returns a random sample of candidate columns, from a generator seeded by
+        the columns themselves, so the same candidates always give the same sample
+
+        :param answers: The candidate answer indices
+        :type answers: numpy.ndarray
+        :param size: The size of the sample
+        :type size: int
+        :return: The sampled answer indices, sorted
+        :rtype: numpy.ndarray
+
+        >>> strategy = EntropyStrategy()
+        >>> columns = np.arange(1000)
+        >>> strategy.sample(columns, 5).tolist() == strategy.sample(columns, 5).tolist()
+        True
+        """
+        answers = np.asarray(answers, dtype=np.intp)
+        digest = hashlib.blake2b(answers.tobytes(), digest_size=8).digest()
+        rng = np.random.default_rng([self.seed, int.from_bytes(digest, "little")])
+        return np.sort(rng.choice(answers, size=size, replace=False))
+
+
+class EntropyStrategy(PartitionStrategy):
+    """
+    Picks the guess whose feedback carries the most information
+    """
+
+    def loss(self, counts, total):
+        probabilities = counts / total
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs = np.where(counts > 0, np.log2(probabilities), 0.0)
+        return (probabilities * logs).sum(axis=1)
+
+
+class ExpectedSizeStrategy(PartitionStrategy):
+    """
+    Picks the guess that leaves the fewest candidates on average
+    """
+
+    def loss(self, counts, total):
+        return (counts.astype(np.float64) ** 2).sum(axis=1) / total
+
+
+class MinimaxStrategy(PartitionStrategy):
+    """
+    Picks the guess whose largest remaining group is smallest
+    """
+
+    def loss(self, counts, total):
+        return counts.max(axis=1)
+
+
+class LookaheadStrategy(ExpectedSizeStrategy):  # pylint: disable=too-many-instance-attributes
+    """
+    Picks the guess that leaves the fewest guesses expected in total, playing
+    out the feedback groups of each guess *depth* plies deep. Only the *width*
+    guesses that leave the fewest candidates on average are played out at each
+    step, and groups past the last ply are costed by estimate_guesses.
+
+    Every set of candidates solved is kept in a transposition table keyed by a
+    fingerprint of the set, so a set reached again, later in the game or in
+    another game, is solved once. The table holds at most *max_entries* sets,
+    dropping the least recently used set when it is full; an entry takes about
+    300 bytes, so the default cap is about 30 MB.
+
+    It is not the default. On every answer of the system dictionary with plant
+    as the opener it averages 3.780 guesses at depth 2 and width 8 and 3.777 at
+    width 16, against 3.786 for EntropyStrategy, which is within the noise of the
+    sample (a standard error of 0.007), and deeper or wider searches level off
+    at 3.777.
+
+    >>> import wordmake
+    >>> wordler = wordmake.Wordler(verbosity=0, strategy=LookaheadStrategy(width=4))
+    >>> wordler.add_wordlist(wordlist=["arose", "alamo", "delve", "llama", "cloud", "mound"])
+    >>> wordler.play_many(["alamo", "cloud", "mound"])
+    [2, 2, 2]
+    >>> wordler.play_many(["llama", "delve"])
+    [2, 2]
+    >>> wordler.strategy.stats()
+    {'hits': 1, 'misses': 1, 'evictions': 0, 'hit_rate': 0.5, 'size': 1}
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        depth=2,
+        width=8,
+        max_entries=100_000,
+        *,
+        guesses="all",
+        max_cells=2_000_000,
+        seed=0,
+    ):
+        super().__init__(guesses, max_cells, seed)
+        self.depth = depth
+        self.width = width
+        self.max_entries = max(1, max_entries)
+        self.table = OrderedDict()
+        self.counts = {"hits": 0, "misses": 0, "evictions": 0}
+        self.feedback = None
+
+    def suggest(self, wordler):
+        """
+        Returns the next guess for the Wordler's current game
+        """
+        feedback = wordler.get_feedback()
+        answers = candidate_columns(wordler, feedback)
+        if answers is None:
+            return wordler.wordsuggest(wordler.length)
+        if len(answers) <= 2:
+            return feedback.answers[answers[0]]
+        if feedback is not self.feedback:
+            # The sets solved are only meaningful against their own table.
+            self.table.clear()
+            self.feedback = feedback
+        return feedback.guesses[self.best_guess(answers, self.depth)[1]]
+
+    def expected_guesses(self, answers, depth):
+        """
+        Returns the guesses a set of candidates is expected to need, looking
+        *depth* plies ahead
+
+        :param answers: The candidate answer columns, sorted
+        :type answers: numpy.ndarray
+        :param depth: The number of plies to play out
+        :type depth: int
+        :rtype: float
+        """
+        if len(answers) <= 2 or depth == 0:
+            return estimate_guesses(len(answers))
+        return self.best_guess(answers, depth)[0]
+
+    def best_guess(self, answers, depth):
+        """
+        Finds the guess that leaves a set of candidates the fewest guesses
+        expected in total, from the transposition table if it was solved before
+
+        :param answers: The candidate answer columns, sorted
+        :type answers: numpy.ndarray
+        :param depth: The number of plies to play out
+        :type depth: int
+        :return: The guesses expected, this one included, and the guess row
+        :rtype: tuple
+        """
+        key = hashlib.blake2b(answers.tobytes(), digest_size=16).digest()
+        entry = self.table.get(key)
+        # A set played out deeper before is at least as good an answer.
+        if entry is not None and entry[0] >= depth:
+            self.counts["hits"] += 1
+            self.table.move_to_end(key)
+            return entry[1:]
+        self.counts["misses"] += 1
+        entry = (depth, *self._search(answers, depth))
+        self.table[key] = entry
+        self.table.move_to_end(key)
+        if len(self.table) > self.max_entries:
+            self.table.popitem(last=False)
+            self.counts["evictions"] += 1
+        return entry[1:]
+
+    def _search(self, answers, depth):
+        """
+        Plays out the best ranked guesses on a set of candidates, dropping a guess
+        as soon as its groups, largest first, show it can't beat the best so far
+        """
+        feedback = self.feedback
+        rows = np.arange(len(feedback.guesses))
+        is_candidate = np.zeros(len(rows), dtype=bool)
+        is_candidate[[feedback.guess_index[feedback.answers[i]] for i in answers]] = True
+        if self.guesses == "candidates":
+            rows = np.flatnonzero(is_candidate)
+        losses = self.score(feedback, rows, answers)
+        solved = 3**feedback.length - 1
+        best = (math.inf, None)
+        for row in rows[np.lexsort((~is_candidate[rows], losses))[: self.width]]:
+            codes = np.asarray(feedback.matrix[row, answers])
+            sizes = np.bincount(codes, minlength=solved + 1)
+            sizes[solved] = 0
+            # A group of k candidates needs at least (2k - 1) / k more guesses,
+            # which is exact for groups of one or two.
+            expected = 1 + (2 * sizes[sizes > 0] - 1).sum() / len(answers)
+            for code in np.argsort(-sizes, kind="stable")[: np.count_nonzero(sizes >= 3)]:
+                if expected >= best[0]:
+                    break
+                size = sizes[code]
+                expected += (
+                    size * self.expected_guesses(answers[codes == code], depth - 1)
+                    - (2 * size - 1)
+                ) / len(answers)
+            else:
+                if expected < best[0]:
+                    best = (float(expected), int(row))
+        return best
+
+    def stats(self):
+        """
+        Returns the hit, miss and eviction counts of the transposition table,
+        the hit rate and the size
+        """
+        lookups = self.counts["hits"] + self.counts["misses"]
+        return dict(
+            self.counts,
+            hit_rate=self.counts["hits"] / lookups if lookups else 0.0,
+            size=len(self.table),
+        )
+
+
+def estimate_guesses(size):
+    """
+    Estimates the guesses a set of candidates needs without looking ahead: a
+    candidate is guessed, and the rest need more the larger the set is
+
+    :param size: The number of candidates
+    :type size: int
+    :rtype: float
+
+    >>> estimate_guesses(1), estimate_guesses(2)
+    (1.0, 1.5)
+    >>> round(estimate_guesses(100), 2)
+    2.82
+    """
+    if size <= 2:
+        return (2 * size - 1) / size
+    return 1 + (size - 1) / size * (LEAF_BASE + LEAF_GROWTH * math.log(size))
+
+
+def strategy_name(strategy):
+    """
+    Returns the name of a strategy in STRATEGIES, or its class name if it isn't one
+
+    >>> strategy_name(EntropyStrategy()), strategy_name(FrequencyStrategy(depth=3))
+    ('entropy', 'frequency')
+    """
+    names = {kind: name for name, kind in STRATEGIES.items()}
+    return names.get(type(strategy), type(strategy).__name__)
+
+
+def candidate_columns(wordler, feedback):
+    """
+    Returns the Wordler's candidates as answer indices of the feedback table
+
+    :return: The answer indices, or None if a candidate isn't in the table
+    :rtype: numpy.ndarray or None
+
+    >>> import wordmake
+    >>> import wordmake_feedback
+    >>> wordler = wordmake.Wordler(verbosity=0)
+    >>> wordler.add_wordlist(wordlist=["arose", "alamo", "delve", "llama"])
+    >>> wordler.reset()
+    >>> candidate_columns(wordler, wordler.get_feedback()).tolist()
+    [0, 1, 2, 3]
+    >>> answers = ["llama", "delve", "alamo", "arose"]
+    >>> table = wordmake_feedback.FeedbackMatrix(wordler.get_wordlist(), answers)
+    >>> candidate_columns(wordler, table).tolist()
+    [3, 2, 1, 0]
+    """
+    index = wordler.get_index()
+    candidates = wordler.game_attrs.get_candidates(index)
+    # When the table and the index were built from the same answer list, the
+    # table's columns are the index rows.
+    if candidates is not None and index.source is feedback.answer_source:
+        return wordmake_index.bits_to_indices(candidates, len(index.words))
+    columns = [feedback.answer_index.get(i) for i in wordler.game_attrs["game_list"]]
+    if None in columns or not columns:
+        return None
+    return np.array(columns, dtype=np.intp)
+
+
+def pattern_counts(matrix, rows, answers, patterns):
+    """
+    Counts, for each guess row, how many of the answers give each pattern
+
+    :param matrix: The guess by answer pattern table
+    :type matrix: numpy.ndarray
+    :param rows: The guess indices
+    :type rows: numpy.ndarray
+    :param answers: The answer indices
+    :type answers: numpy.ndarray
+    :param patterns: The number of possible pattern codes
+    :type patterns: int
+    :return: A rows by patterns array of counts
+    :rtype: numpy.ndarray
+
+    >>> table = np.array([[0, 1, 1], [2, 2, 2]], dtype=np.uint8)
+    >>> pattern_counts(table, np.arange(2), np.arange(3), 3).tolist()
+    [[1, 2, 0], [0, 0, 3]]
+    """
+    codes = np.asarray(matrix[np.ix_(rows, answers)], dtype=np.int64)
+    codes += np.arange(len(rows))[:, np.newaxis] * patterns
+    return np.bincount(codes.ravel(), minlength=len(rows) * patterns).reshape(
+        len(rows), patterns
+    )
+
+
+def answer_pattern_counts(table, rows, answers, patterns, chunk_size=256):
+    """
+    Counts, for each guess row, how many of the answers give each pattern, from
+    the answer-major table (see wordmake_feedback.FeedbackMatrix.answer_major).
+    Guesses are counted a block at a time, so each block's codes stay in cache
+
+    :param table: The answer by guess pattern table
+    :type table: numpy.ndarray
+    :param rows: The guess indices
+    :type rows: numpy.ndarray
+    :param answers: The answer indices
+    :type answers: numpy.ndarray
+    :param patterns: The number of possible pattern codes
+    :type patterns: int
+    :param chunk_size: How many guesses to count at once
+    :type chunk_size: int
+    :return: A rows by patterns array of counts
+    :rtype: numpy.ndarray
+
+    >>> table = np.array([[0, 1, 1], [2, 2, 2]], dtype=np.uint8)
+    >>> answer_pattern_counts(table.T, np.arange(2), np.arange(3), 3).tolist()
+    [[1, 2, 0], [0, 0, 3]]
+    """
+    counts = np.empty((len(rows), patterns), dtype=np.intp)
+    offsets = np.arange(chunk_size, dtype=np.intp) * patterns
+    for start in range(0, len(rows), chunk_size):
+        block = rows[start : start + chunk_size]
+        codes = table[np.ix_(answers, block)] + offsets[: len(block)]
+        counts[start : start + len(block)] = np.bincount(
+            codes.ravel(), minlength=len(block) * patterns
+        ).reshape((len(block), patterns))
+    return counts
+
+
+STRATEGIES = {
+    "frequency": FrequencyStrategy,
+    "entropy": EntropyStrategy,
+    "expected": ExpectedSizeStrategy,
+    "minimax": MinimaxStrategy,
+    "lookahead": LookaheadStrategy,
+}
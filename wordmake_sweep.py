@@ -0,0 +1,164 @@
+"""
+Wordmake_sweep scores every starting word against every possible answer,
+spreading the starting words across a pool of worker processes.
+
+The wordlist is placed in shared memory once and every worker attaches to it.
+Each worker memory-maps the feedback table once and then reuses a single Wordler
+for all of its games, so the per-game cost is only the game itself.
+
+Results go to a wordmake_results.ResultsStore as each opener finishes, so an
+interrupted sweep picks up where it stopped.
+"""
+
+import argparse
+import multiprocessing
+import os
+
+import wordmake
+import wordmake_feedback
+import wordmake_results
+import wordmake_store
+
+DICTIONARY = "/usr/share/dict/words"
+
+_worker_state = {}
+
+
+def _init_worker(filename, wordlist, handle=None):
+    """
+    Loads the wordlist and feedback table into a worker process
+
+    :param filename: The dictionary file to read if no wordlist is given
+    :type filename: string
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param handle: The handle of a shared WordStore to attach to instead
+    :type handle: tuple
+    """
+    wordler = wordmake.Wordler(verbosity=0)
+    if handle:
+        _worker_state["store"] = wordmake_store.WordStore.attach(handle)
+        wordler.add_wordlist(store=_worker_state["store"])
+    elif wordlist:
+        wordler.add_wordlist(wordlist=wordlist)
+    else:
+        wordler.add_wordlist(filename=filename)
+    _worker_state["wordler"] = wordler
+    _worker_state["feedback"] = wordmake_feedback.FeedbackMatrix(
+        wordler.get_wordlist()
+    )
+
+
+def score_opener(opener):
+    """
+    Plays every answer in the wordlist with the given starting word
+
+    :param opener: The starting word
+    :type opener: string
+    :return: The starting word, its average guess count and its failure count
+    :rtype: tuple
+    """
+    wordler = _worker_state["wordler"]
+    outlist = wordler.play_many(
+        wordler.get_wordlist(), opener, _worker_state["feedback"].evaluate
+    )
+    avgscore = sum(outlist) / len(outlist)
+    failcount = len([i for i in outlist if i > 6])
+    return opener, avgscore, failcount
+
+
+def sweep(openers=None, filename=DICTIONARY, wordlist=None, workers=None):
+    """
+    Scores many starting words, yielding results in the order of *openers*
+
+    :param openers: The starting words to try, the whole wordlist if not specified
+    :type openers: list of strings
+    :param filename: The dictionary file to read if no wordlist is given
+    :type filename: string
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param workers: The number of worker processes, one per core if not specified
+    :type workers: int
+    :return: A generator of (word, avgscore, failcount) tuples
+    :rtype: generator
+    """
+    if not wordlist:
+        wordlist = wordmake_store.load_wordlist(filename)
+    if openers is None:
+        openers = wordlist
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(None, wordlist)
+        yield from map(score_opener, openers)
+        return
+    store = wordmake_store.WordStore.from_words(wordlist, shared=True)
+    try:
+        with multiprocessing.Pool(
+            workers, initializer=_init_worker, initargs=(None, None, store.share())
+        ) as pool:
+            yield from pool.imap(score_opener, openers)
+    finally:
+        store.close(unlink=True)
+
+
+def resume(store, wordlist, workers=None):
+    """
+    Scores the openers of the wordlist that the store doesn't hold yet,
+    adding each result to the store as it finishes
+
+    :param store: The results store, opened with the key of this wordlist
+    :type store: wordmake_results.ResultsStore
+    :param wordlist: The list of legal words
+    :type wordlist: list of strings
+    :param workers: The number of worker processes, one per core if not specified
+    :type workers: int
+    :return: A generator of the new (word, avgscore, failcount) tuples
+    :rtype: generator
+    """
+    pending = [i for i in wordlist if i not in store]
+    if not pending:
+        return
+    for word, avgscore, failcount in sweep(pending, wordlist=wordlist, workers=workers):
+        store.add(word, avgscore, failcount)
+        yield word, avgscore, failcount
+
+
+def open_store(wordlist, path="results.jsonl", top=10):
+    """
+    Opens the results store of a sweep over the wordlist
+    """
+    return wordmake_results.ResultsStore(
+        path, key=wordmake_feedback.wordlist_hash(wordlist), top=top
+    )
+
+
+def positive_int(text):
+    """
+    Parses a command line argument that must be a positive integer
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"{text} is not a positive integer")
+    return value
+
+
+def main():
+    """
+    Runs the full starting word sweep, resuming from the results store, and
+    writes the results as CSV
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=positive_int, default=None)
+    parser.add_argument("--dictionary", default=DICTIONARY)
+    parser.add_argument("--store", default="results.jsonl")
+    parser.add_argument("--output", default="results.txt")
+    args = parser.parse_args()
+    wordlist = wordmake_store.load_wordlist(args.dictionary)
+    with open_store(wordlist, args.store) as store:
+        for _ in resume(store, wordlist, args.workers):
+            pass
+    store.export_csv(args.output, wordlist)
+
+
+if __name__ == "__main__":
+    main()